@@ -0,0 +1,22 @@
+#!/usr/bin/python3
+# Copyright (C) 2016 Renan Guilherme Lebre Ramos
+# This file is a part of smtracker.
+#
+# smtracker is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Benchmarks for measuring how smtracker scales with the size of a profile.
+
+Run them from the repository root with `python3 -m benchmarks.run`, and
+generate Stats.xml files of any size with `python3 -m benchmarks.generate`.
+"""
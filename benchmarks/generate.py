@@ -0,0 +1,201 @@
+#!/usr/bin/python3
+# Copyright (C) 2016 Renan Guilherme Lebre Ramos
+# This file is a part of smtracker.
+#
+# smtracker is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Generates synthetic Stats.xml files for benchmarking.
+
+The same options and seed always generate the same files.
+"""
+
+import argparse
+import os
+import random
+from xml.sax.saxutils import quoteattr
+
+STEPS_TYPES = ("dance-single", "dance-double")
+DIFFICULTIES = ("Beginner", "Easy", "Medium", "Hard", "Challenge")
+NAMES = ("EVIL", "GOOD", "ACE", "RNG", "STEP")
+MODIFIERS = ("1.5x, Overhead", "C450, Overhead", "2x, Reverse, Overhead")
+
+GENERAL_DATA = """<GeneralData>
+<DisplayName>{name}</DisplayName>
+<Guid>{guid}</Guid>
+<IsMachine>{is_machine}</IsMachine>
+<LastPlayedDate>2016-06-09</LastPlayedDate>
+<TotalGameplaySeconds>{seconds}</TotalGameplaySeconds>
+<NumSongsPlayedByDifficulty>
+<Easy>3</Easy>
+<Hard>12</Hard>
+</NumSongsPlayedByDifficulty>
+</GeneralData>
+"""
+
+HIGHSCORE = """<HighScore>
+<Name>{name}</Name>
+<Grade>{grade}</Grade>
+<Score>0</Score>
+<PercentDP>{percent:.6f}</PercentDP>
+<Modifiers>{modifiers}</Modifiers>
+<DateTime>2016-{month:02}-{day:02} {hour:02}:00:00</DateTime>
+<TapNoteScores>
+<HitMine>{HitMine}</HitMine>
+<AvoidMine>3</AvoidMine>
+<Miss>{Miss}</Miss>
+<W5>{W5}</W5>
+<W4>{W4}</W4>
+<W3>{W3}</W3>
+<W2>{W2}</W2>
+<W1>{W1}</W1>
+</TapNoteScores>
+<HoldNoteScores>
+<LetGo>{LetGo}</LetGo>
+<Held>{Held}</Held>
+<MissedHold>0</MissedHold>
+</HoldNoteScores>
+</HighScore>
+"""
+
+
+def write_highscore(dest, rng, is_machine):
+    """Writes a random <HighScore>."""
+    counts = {'W1': rng.randint(1, 400), 'W2': rng.randint(0, 60),
+              'W3': rng.randint(0, 15), 'W4': rng.randint(0, 6),
+              'W5': rng.randint(0, 4), 'Miss': rng.randint(0, 8),
+              'HitMine': rng.randint(0, 3), 'Held': rng.randint(0, 30),
+              'LetGo': rng.randint(0, 3)}
+    if rng.random() < 0.1:
+        grade = "Failed"
+    else:
+        grade = "Tier{:02}".format(rng.randint(1, 7))
+    dest.write(HIGHSCORE.format(
+        name=rng.choice(NAMES) if is_machine else NAMES[0],
+        grade=grade,
+        percent=rng.random(),
+        modifiers=rng.choice(MODIFIERS),
+        month=rng.randint(1, 12),
+        day=rng.randint(1, 28),
+        hour=rng.randint(0, 23),
+        **counts))
+
+
+def write_stats(dest, songs=1000, steps_types=STEPS_TYPES,
+                difficulties=DIFFICULTIES, highscores=3, seed=0, name="TESTER",
+                is_machine=False):
+    """Writes a synthetic Stats.xml file.
+
+    Arguments:
+    dest         -- a text file object to write to
+    songs        -- how many songs have scores
+    steps_types  -- the StepsTypes each song can have Steps for
+    difficulties -- the difficulties each StepsType can have Steps for
+    highscores   -- the most HighScores in each HighScoreList
+    seed         -- the seed for the random scores
+    name         -- the profile's DisplayName
+    is_machine   -- whether this is a machine profile
+    """
+    rng = random.Random(seed)
+    dest.write('<?xml version="1.0" encoding="UTF-8" ?>\n<Stats>\n')
+    dest.write(GENERAL_DATA.format(name=name,
+                                   guid="{:016x}".format(rng.getrandbits(64)),
+                                   is_machine=1 if is_machine else 0,
+                                   seconds=rng.randint(0, 10 ** 6)))
+
+    dest.write("<SongScores>\n")
+    for song in range(songs):
+        song_dir = "Songs/Group {}/Song {}/".format(song % 20, song)
+        dest.write("<Song Dir={}>\n".format(quoteattr(song_dir)))
+        for steps_type in steps_types:
+            for difficulty in difficulties:
+                # Most players don't play every chart of a song
+                if rng.random() < 0.4:
+                    continue
+                dest.write('<Steps Difficulty="{}" StepsType="{}">\n'
+                           '<HighScoreList>\n<NumTimesPlayed>{}</NumTimesPlayed>\n'
+                           .format(difficulty, steps_type, rng.randint(1, 20)))
+                # Some charts were only played on AutoPlay
+                if rng.random() >= 0.05:
+                    for _ in range(rng.randint(1, highscores)):
+                        write_highscore(dest, rng, is_machine)
+                dest.write("</HighScoreList>\n</Steps>\n")
+        dest.write("</Song>\n")
+    dest.write("</SongScores>\n<CourseScores>\n</CourseScores>\n</Stats>\n")
+
+
+def write_profiles(folder, profiles=5, **options):
+    """Writes a machine profile and some local profiles to a folder, laid
+    out like StepMania's Save folder (MachineProfile/Stats.xml and
+    LocalProfiles/0000000N/Stats.xml).
+
+    Arguments:
+    folder   -- where the profiles should be written
+    profiles -- how many local profiles to write
+    options  -- passed to write_stats; the seed of each profile is derived
+                from options['seed']
+    """
+    seed = options.pop('seed', 0)
+    paths = []
+
+    path = os.path.join(folder, "MachineProfile", "Stats.xml")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as dest:
+        write_stats(dest, seed=seed, name="", is_machine=True, **options)
+    paths.append(path)
+
+    for profile in range(profiles):
+        path = os.path.join(folder, "LocalProfiles", "{:08}".format(profile),
+                            "Stats.xml")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as dest:
+            write_stats(dest, seed=seed + profile + 1,
+                        name="PLAYER{}".format(profile), **options)
+        paths.append(path)
+    return paths
+
+
+def main():
+    """Generates Stats.xml files from the command line."""
+    parser = argparse.ArgumentParser(description="Generates synthetic "
+                                     "Stats.xml files for benchmarking.")
+    parser.add_argument('dest', help="the Stats.xml file to write, or a "
+                        "folder to write profiles to if --profiles is used")
+    parser.add_argument('--songs', type=int, default=1000,
+                        help="how many songs have scores (default: 1000)")
+    parser.add_argument('--steps-types', nargs='+', default=STEPS_TYPES,
+                        help="the StepsTypes songs can have")
+    parser.add_argument('--difficulties', nargs='+', default=DIFFICULTIES,
+                        help="the difficulties each StepsType can have")
+    parser.add_argument('--highscores', type=int, default=3,
+                        help="the most HighScores per chart (default: 3)")
+    parser.add_argument('--profiles', type=int,
+                        help="write a machine profile and this many local "
+                        "profiles instead of a single file")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="the seed for the random scores (default: 0)")
+    args = parser.parse_args()
+
+    options = {'songs': args.songs, 'steps_types': args.steps_types,
+               'difficulties': args.difficulties,
+               'highscores': args.highscores, 'seed': args.seed}
+    if args.profiles is not None:
+        for path in write_profiles(args.dest, args.profiles, **options):
+            print(path)
+    else:
+        with open(args.dest, 'w', encoding='utf-8') as dest:
+            write_stats(dest, **options)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+#!/usr/bin/python3
+# Copyright (C) 2016 Renan Guilherme Lebre Ramos
+# This file is a part of smtracker.
+#
+# smtracker is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Runs end-to-end benchmarks on generated Stats.xml files, and reports
+the results as JSON."""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import smtracker
+import smtracker.utils.batch as batch
+import smtracker.utils.format as smformat
+import smtracker.utils.highscores as highscores
+import smtracker.utils.parse as parse
+import smtracker.utils.systems as systems
+import smtracker.output.html as html
+import smtracker.output.plain as plain
+
+import benchmarks.generate as generate
+
+MODE = "dance-single"
+
+
+def measure(function, repeat):
+    """Calls a function a few times, and returns how long it took in
+    seconds (best, median and every run)."""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        runs.append(time.perf_counter() - start)
+    return {'best': min(runs), 'median': statistics.median(runs), 'runs': runs}
+
+
+def get_benchmarks(paths, difficulties):
+    """Returns a dict with a function for each benchmark.
+
+    Arguments:
+    paths        -- the generated Stats.xml files; the first is benchmarked
+                    on its own, and all of them are listed as profiles
+    difficulties -- the difficulties the outputs should show
+    """
+    path = paths[0]
+    stats = parse.StatsFile(path).load()
+    records = stats.scored_records()
+
+    benchmarks = {}
+    benchmarks['parse'] = lambda: parse.StatsFile(path).load()
+    benchmarks['highscore_table'] = lambda: highscores.read_table(
+        parse.StatsFile(path))
+    benchmarks['read_header'] = lambda: [parse.read_header(profile)
+                                         for profile in paths]
+
+    def grade(theme):
+        return lambda: [smformat.highscore_grade(record, theme)
+                        for record in records]
+    for theme in systems.get_names():
+        benchmarks['grade_' + theme] = grade(theme)
+    benchmarks['grade_batch'] = lambda: batch.grade_records(records)
+
+    # Grading with nothing in the memo, like the first grading of a profile
+    def grade_cold():
+        systems.clear_memo()
+        batch.grade_records(records)
+    benchmarks['grade_batch_cold'] = grade_cold
+
+    def report():
+        with contextlib.redirect_stdout(io.StringIO()):
+            plain.report(stats, MODE, difficulties, "sm5")
+    benchmarks['plain_report'] = report
+    benchmarks['html_generate'] = lambda: html.generate(stats, MODE,
+                                                        difficulties, "sm5")
+
+    init_table = get_qt_benchmark(stats, difficulties)
+    if init_table is not None:
+        benchmarks['qt_init_table'] = init_table
+    return benchmarks
+
+
+def get_startup_benchmarks(folder):
+    """Returns a dict with functions which run smtracker in a new process on
+    a tiny Stats.xml file, so startup (mostly imports) is all that's timed.
+
+    Arguments:
+    folder -- where the tiny Stats.xml file can be written
+    """
+    path = os.path.join(folder, "Tiny.xml")
+    with open(path, 'w', encoding='utf-8') as dest:
+        generate.write_stats(dest, songs=1)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(smtracker.__file__)))
+
+    def startup(*arguments):
+        command = [sys.executable, '-c', 'import smtracker.smtracker as s; s.main()']
+        return lambda: subprocess.run(command + list(arguments), cwd=root,
+                                      check=True, stdout=subprocess.DEVNULL)
+
+    return {'startup_import': lambda: subprocess.run(
+                [sys.executable, '-c', 'import smtracker.smtracker'],
+                cwd=root, check=True),
+            'startup_plain': startup(path, '-o', 'plain', '--no-cache'),
+            'startup_html': startup(path, '-o', 'html', '--no-cache', '-d',
+                                    os.path.join(folder, "Tiny.html"))}
+
+
+def get_qt_benchmark(stats, difficulties):
+    """Returns a function which rebuilds a Viewer's table from scratch on an
+    offscreen display, or None if PyQt5 can't be used."""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    try:
+        from PyQt5.QtWidgets import QApplication
+        import smtracker.output.qt as qt
+    except ImportError:
+        return None
+
+    # The application has to outlive the benchmark
+    get_qt_benchmark.app = QApplication.instance() or QApplication([])
+    stats.grades = batch.grade_records(stats.scored_records())
+    viewer = qt.Viewer(stats, MODE, list(difficulties), "sm5")
+
+    def init_table():
+        viewer.model.row_cache = {}
+        viewer.column_widths = {}
+        viewer.init_table()
+    return init_table
+
+
+def main():
+    """Generates the Stats.xml files, runs the benchmarks and prints (or
+    saves) their results as JSON."""
+    parser = argparse.ArgumentParser(description="Benchmarks smtracker on "
+                                     "generated Stats.xml files.")
+    parser.add_argument('--songs', type=int, default=1000,
+                        help="how many songs have scores (default: 1000)")
+    parser.add_argument('--steps-types', nargs='+',
+                        default=generate.STEPS_TYPES,
+                        help="the StepsTypes songs can have")
+    parser.add_argument('--difficulties', nargs='+',
+                        default=generate.DIFFICULTIES,
+                        help="the difficulties each StepsType can have")
+    parser.add_argument('--highscores', type=int, default=3,
+                        help="the most HighScores per chart (default: 3)")
+    parser.add_argument('--profiles', type=int, default=5,
+                        help="how many local profiles to generate besides "
+                        "the machine profile (default: 5)")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="the seed for the random scores (default: 0)")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="how many times each benchmark runs (default: 5)")
+    parser.add_argument('--only', nargs='+', metavar='BENCHMARK',
+                        help="run only these benchmarks")
+    parser.add_argument('-o', dest='output', metavar='FILE',
+                        help="save the results to FILE instead of printing them")
+    args = parser.parse_args()
+
+    options = {'songs': args.songs, 'steps_types': args.steps_types,
+               'difficulties': args.difficulties,
+               'highscores': args.highscores, 'seed': args.seed}
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="smtracker-bench-") as folder:
+        paths = generate.write_profiles(folder, args.profiles, **dict(options))
+        benchmarks = get_benchmarks(paths, args.difficulties)
+        benchmarks.update(get_startup_benchmarks(folder))
+        for name, function in benchmarks.items():
+            if args.only and name not in args.only:
+                continue
+            print("Running {}...".format(name), file=sys.stderr)
+            results[name] = measure(function, args.repeat)
+        file_size = os.path.getsize(paths[0])
+
+    report = {'smtracker': smtracker.__version__,
+              'python': platform.python_version(),
+              'platform': platform.platform(),
+              'parameters': dict(options, profiles=args.profiles,
+                                 repeat=args.repeat, file_size=file_size),
+              'results': results}
+
+    if args.output:
+        with open(args.output, 'w') as dest:
+            json.dump(report, dest, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
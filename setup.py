@@ -42,9 +42,10 @@ setup(
         'Operating System :: POSIX :: Linux',
         'Programming Language :: Python :: 3'
         ],
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks', 'benchmarks.*']),
     package_data={'smtracker':
-        ['templates/*.html', 'templates/*.css', 'images/*.png']},
+        ['templates/*.html', 'templates/*.css', 'templates/*.js',
+         'images/*.png']},
     entry_points={
         'gui_scripts':
             ['smtracker = smtracker.smtracker:main']
@@ -0,0 +1,196 @@
+#!/usr/bin/python3
+# Copyright (C) 2016 Renan Guilherme Lebre Ramos
+# This file is a part of smtracker.
+#
+# smtracker is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Functions for exporting scores (or the changes between two copies of a
+Stats.xml file) as CSV or JSON Lines, one chart at a time.
+
+Charts are written as soon as they are read, so files of any size can be
+exported.
+"""
+
+import csv
+import json
+import os
+import sys
+from contextlib import contextmanager
+
+import smtracker.utils.diff as diff
+import smtracker.utils.format as smformat
+import smtracker.utils.parse as parse
+import smtracker.utils.systems as systems
+import smtracker.utils.timing as timing
+
+# How much is written to the destination at a time
+BUFFER_SIZE = 1024 * 1024
+
+# Fields of each exported chart, followed by the score of every grading system
+# which has one (see get_fields)
+FIELDS = (('group', 'title', 'mode', 'difficulty', 'grade', 'percent') +
+          parse.TIMINGS)
+
+
+def get_scoring_systems():
+    """Returns the grading systems which have a score of their own."""
+    return [system for system in systems.SYSTEMS.values()
+            if system.score_function is not None]
+
+
+def get_fields():
+    """Returns the name of each field iter_charts yields."""
+    return FIELDS + tuple(system.name + '_score'
+                          for system in get_scoring_systems())
+
+
+def iter_charts(stats, mode, difficulties, theme):
+    """Yields a tuple with the get_fields() of each chart with a score,
+    where a system's score is None if it can't be calculated (like for a
+    score without notes).
+
+    Arguments:
+    stats        -- a parse.StatsFile for the Stats.xml file
+    mode         -- the game mode to export scores from
+    difficulties -- the difficulties which should be exported
+    theme        -- which metrics should be used for grades
+    """
+    score_functions = [system.score for system in get_scoring_systems()]
+    for song_dir, records in timing.timed("extract", stats):
+        location = song_dir.split('/')
+        charts = parse.index_records(records)
+        for difficulty in difficulties:
+            record = charts.get((mode, difficulty))
+            if record is None or not record.has_score():
+                continue
+
+            yield ((location[1], location[2], mode, difficulty,
+                    smformat.highscore_grade(record, theme),
+                    round(record.percent_dp * 100, 4)) +
+                   tuple(getattr(record, timing) for timing in parse.TIMINGS) +
+                   tuple(function(record) for function in score_functions))
+
+
+@contextmanager
+def open_dest(dest):
+    """Opens the file to export to, or uses stdout if dest is None or '-'.
+
+    When stdout is piped to a program which stops reading early (like
+    head), the export just stops.
+    """
+    if dest is None or dest == '-':
+        try:
+            yield sys.stdout
+            sys.stdout.flush()
+        except BrokenPipeError:
+            # Python flushes stdout again on the way out, which would fail
+            # just the same, so whatever is left goes to devnull instead
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, sys.stdout.fileno())
+            sys.exit(1)
+    else:
+        with open(dest, 'w', buffering=BUFFER_SIZE, encoding='utf-8',
+                  newline='') as dest_file:
+            yield dest_file
+
+
+def save_csv(stats, mode, difficulties, theme, dest=None):
+    """Exports the scores as CSV, with a header row naming the fields.
+
+    Arguments:
+    stats        -- a parse.StatsFile for the Stats.xml file
+    mode         -- the game mode to export scores from
+    difficulties -- the difficulties which should be exported
+    theme        -- which metrics should be used for grades
+    dest         -- the file to write, or None for stdout
+    """
+    if stats is None:
+        sys.exit("Error: Could not find a Stats.xml file")
+
+    with open_dest(dest) as dest_file:
+        writer = csv.writer(dest_file)
+        writer.writerow(get_fields())
+        writer.writerows(iter_charts(stats, mode, difficulties, theme))
+
+
+def save_jsonl(stats, mode, difficulties, theme, dest=None):
+    """Exports the scores as JSON Lines, with an object for each chart. See
+    save_csv for the arguments."""
+    if stats is None:
+        sys.exit("Error: Could not find a Stats.xml file")
+
+    encoder = json.JSONEncoder(ensure_ascii=False)
+    fields = get_fields()
+    with open_dest(dest) as dest_file:
+        for chart in iter_charts(stats, mode, difficulties, theme):
+            dest_file.write(encoder.encode(dict(zip(fields, chart))))
+            dest_file.write("\n")
+
+
+def get_diff_fields(score_diff):
+    """Returns the name of each field iter_diff yields, with the old and new
+    grade of every grading system."""
+    return (('change', 'group', 'title', 'mode', 'difficulty', 'old_percent',
+             'new_percent', 'percent_delta') +
+            tuple(theme + suffix for theme in score_diff.themes
+                  for suffix in ('_old', '_new')))
+
+
+def iter_diff(score_diff):
+    """Yields a tuple with the get_diff_fields() of each chart whose score
+    changed between two Stats.xml files, as it is found.
+
+    Arguments:
+    score_diff -- the diff.ScoreDiff of the two files
+    """
+    def percent(snapshot):
+        return None if snapshot is None else round(snapshot.percent_dp * 100, 4)
+
+    for change in score_diff:
+        location = change.song_dir.split('/')
+        delta = diff.get_percent_delta(change)
+        grades = []
+        for position in range(len(score_diff.themes)):
+            for snapshot in (change.old, change.new):
+                grades.append(None if snapshot is None
+                              else snapshot.grades[position])
+        yield ((change.kind, location[1], location[2], score_diff.mode,
+                change.difficulty, percent(change.old), percent(change.new),
+                None if delta is None else round(delta * 100, 4)) +
+               tuple(grades))
+
+
+def save_diff_csv(score_diff, dest=None):
+    """Exports the changes between two Stats.xml files as CSV, with a header
+    row naming the fields.
+
+    Arguments:
+    score_diff -- the diff.ScoreDiff of the two files
+    dest       -- the file to write, or None for stdout
+    """
+    with open_dest(dest) as dest_file:
+        writer = csv.writer(dest_file)
+        writer.writerow(get_diff_fields(score_diff))
+        writer.writerows(iter_diff(score_diff))
+
+
+def save_diff_jsonl(score_diff, dest=None):
+    """Exports the changes between two Stats.xml files as JSON Lines, with
+    an object for each chart. See save_diff_csv for the arguments."""
+    encoder = json.JSONEncoder(ensure_ascii=False)
+    fields = get_diff_fields(score_diff)
+    with open_dest(dest) as dest_file:
+        for chart in iter_diff(score_diff):
+            dest_file.write(encoder.encode(dict(zip(fields, chart))))
+            dest_file.write("\n")
@@ -23,30 +23,77 @@ from jinja2 import Environment, PackageLoader
 
 import smtracker.utils.format as smformat
 import smtracker.utils.parse as parse
+import smtracker.utils.timing as timing
 
 
-def generate(stats, mode, difficulties, theme):
-    """Generates an HTML file with all the scores from the Stats file.
+# Rows of the report, as the template reads them
+Song = namedtuple('Song', ['group', 'title', 'scores'])
+Score = namedtuple('Score', ['diff', 'grade', 'perc', 'W1', 'W2', 'W3', 'W4',
+                             'W5', 'Miss'])
+Judgments = namedtuple('Judgments', ['W1', 'W2', 'W3', 'W4', 'W5', 'Miss'])
+
+# How many pieces of the rendered template are written at a time
+STREAM_BUFFER_SIZE = 64
+
+# Templates already compiled by this process, keyed by name
+_TEMPLATES = {}
+
+
+def get_template(name='template.html'):
+    """Returns a template from smtracker's templates, which is only loaded
+    and compiled the first time it is asked for."""
+    try:
+        return _TEMPLATES[name]
+    except KeyError:
+        pass
+
+    env = Environment(loader=PackageLoader('smtracker', 'templates'))
+    _TEMPLATES[name] = env.get_template(name)
+    return _TEMPLATES[name]
+
+
+def iter_songs(stats, mode, difficulties, theme):
+    """Yields a Song for each song in the Stats file, as it is read.
 
     Arguments:
-    stats        -- an pre-rooted ElementTree of the Stats.xml file
-                    (as in 'stats = etree.parse(statsxml).getroot()
+    stats        -- a parse.StatsFile for the Stats.xml file
     mode         -- the game mode to output scores from
     difficulties -- the difficulties which should be printed
     theme        -- which metrics should be used for printing grades
     """
+    for song_dir, records in timing.timed("extract", stats):
+        location = song_dir.split('/')
+        group = location[1]
+        title = location[2]
+
+        scores = []
+        charts = parse.index_records(records)
+        for diff in difficulties:
+            record = charts.get((mode, diff))
+            if record is not None and record.has_score():
+                grade = smformat.highscore_grade(record, theme)
+                percent = "{:.2f}%".format(record.percent_dp * 100)
+
+                scores.append(Score(
+                    diff=diff,
+                    grade=grade,
+                    perc=percent,
+                    W1=record.W1,
+                    W2=record.W2,
+                    W3=record.W3,
+                    W4=record.W4,
+                    W5=record.W5,
+                    Miss=record.Miss))
+            else:
+                scores.append({'diff': diff})
 
-    # Get profile name from tree
-    profile_name = parse.get_profile_name(stats)
-    last_played = parse.get_last_played(stats)
+        yield Song(group, title, scores)
 
-    songs = []
-    song_tuple = namedtuple('Song', ['group', 'title', 'scores'])
-    score_tuple = namedtuple('Score', ['diff', 'grade', 'perc', 'W1', 'W2',
-                                       'W3', 'W4', 'W5', 'Miss'])
-    judgment_tuple = namedtuple('Judgments', ['W1', 'W2', 'W3', 'W4', 'W5', 'Miss'])
 
-    judgments = judgment_tuple(
+def get_context(stats, mode, difficulties, theme):
+    """Returns the variables for rendering template.html. Songs are only read
+    while the template is rendered. See iter_songs for the arguments."""
+    judgments = Judgments(
         W1=smformat.get_judgment_name(theme, 'W1'),
         W2=smformat.get_judgment_name(theme, 'W2'),
         W3=smformat.get_judgment_name(theme, 'W3'),
@@ -54,58 +101,25 @@ def generate(stats, mode, difficulties, theme):
         W5=smformat.get_judgment_name(theme, 'W5'),
         Miss=smformat.get_judgment_name(theme, 'Miss'))
 
-    for song in stats.find("SongScores"):
-        location = song.attrib['Dir'].split('/')
-        group = location[1]
-        title = location[2]
+    return {'name': parse.get_profile_name(stats.header),
+            'last_played': parse.get_last_played(stats.header),
+            'difficulties': difficulties,
+            'songs': iter_songs(stats, mode, difficulties, theme),
+            'judgments': judgments}
 
-        scores = []
-        step_counter = 0
-        for diff in difficulties:
-            try:
-                if song[step_counter].attrib['Difficulty'] == diff and \
-                   song[step_counter].attrib['StepsType'] == mode:
-                    try:
-                        grade = smformat.highscore_grade(song[step_counter], theme)
-                        percent = "{:.2f}%".format(float(parse.highscore_stat(
-                            song[step_counter], "PercentDP")) * 100)
-                        timings = parse.highscore_timings(song[step_counter])
-
-                        scores.append(score_tuple(
-                            diff=diff,
-                            grade=grade,
-                            perc=percent,
-                            W1=timings['W1'],
-                            W2=timings['W2'],
-                            W3=timings['W3'],
-                            W4=timings['W4'],
-                            W5=timings['W5'],
-                            Miss=timings['Miss']))
-
-                    except AttributeError:
-                        scores.append({'diff': diff})
-                    step_counter = step_counter + 1
-                else:
-                    scores.append({'diff': diff})
-            except IndexError:
-                scores.append({'diff': diff})
 
-        songs.append(song_tuple(group, title, scores))
+def generate(stats, mode, difficulties, theme):
+    """Generates an HTML file with all the scores from the Stats file, and
+    returns it as a single string. See iter_songs for the arguments."""
+    return get_template().render(**get_context(stats, mode, difficulties, theme))
 
-    env = Environment(loader=PackageLoader('smtracker', 'templates'))
-    template = env.get_template('template.html')
-    return(template.render(name=profile_name,
-                           last_played=last_played,
-                           difficulties=difficulties,
-                           songs=songs,
-                           judgments=judgments))
 
 def save(stats, mode, difficulties, theme, dest='/tmp/sm.html'):
-    """Saves an HTML file generated with the generate function.
+    """Saves an HTML report, writing it as it is rendered instead of keeping
+    the whole report in memory.
 
     Arguments:
-    stats        -- an pre-rooted ElementTree of the Stats.xml file
-                    (as in 'stats = etree.parse(statsxml).getroot()
+    stats        -- a parse.StatsFile for the Stats.xml file
     mode         -- the game mode to output scores from
     difficulties -- the difficulties which should be printed
     theme        -- which metrics should be used for printing grades
@@ -115,5 +129,48 @@ def save(stats, mode, difficulties, theme, dest='/tmp/sm.html'):
     if stats is None:
         print("Error: Could not find a Stats.xml file")
     else:
+        context = get_context(stats, mode, difficulties, theme)
+        stream = get_template().stream(**context)
+        stream.enable_buffering(STREAM_BUFFER_SIZE)
+        # Songs are read, rendered and written at the same time
+        with timing.phase("render"):
+            with open(dest, 'w') as filename:
+                stream.dump(filename)
+
+
+# A chart of the leaderboard, as leaderboard.html reads it
+Chart = namedtuple('Chart', ['group', 'title', 'diff', 'players', 'entries'])
+
+
+def iter_charts(board, top):
+    """Yields a Chart with the top scores of each chart of a
+    rivals.Leaderboard, as it is rendered."""
+    for song_dir, diff, players, entries in board.iter_charts(top):
+        location = song_dir.split('/')
+        yield Chart(location[1], location[2], diff, players, entries)
+
+
+def save_leaderboard(board, top, rival=None, dest='/tmp/sm.html'):
+    """Saves an HTML page comparing the profiles of a rivals.Leaderboard,
+    writing it as it is rendered.
+
+    Arguments:
+    board -- the rivals.Leaderboard to save
+    top   -- how many scores to show for each chart
+    rival -- the profile whose rivals should be shown (the first one, if
+             None)
+    dest  -- where should the file be saved
+    """
+    rival = 0 if rival is None else board.find_profile(rival)
+    context = {'profiles': board.profiles,
+               'chart_count': len(board.keys),
+               'standings': board.standings(),
+               'rival': rival,
+               'rivals': board.rivals(rival) if board.profiles else [],
+               'top': top,
+               'charts': iter_charts(board, top)}
+    stream = get_template('leaderboard.html').stream(**context)
+    stream.enable_buffering(STREAM_BUFFER_SIZE)
+    with timing.phase("render"):
         with open(dest, 'w') as filename:
-            filename.write(generate(stats, mode, difficulties, theme))
+            stream.dump(filename)
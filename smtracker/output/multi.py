@@ -0,0 +1,170 @@
+#!/usr/bin/python3
+# Copyright (C) 2016 Renan Guilherme Lebre Ramos
+# This file is a part of smtracker.
+#
+# smtracker is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Functions for writing reports for many profiles at once.
+
+Profiles are parsed, graded and written by a pool of processes, one profile
+at a time each, so every core gets a profile to work on. An index page links
+to every report.
+"""
+
+import contextlib
+import os
+import sys
+import xml.etree.ElementTree as etree
+from concurrent.futures import ProcessPoolExecutor
+
+import smtracker.utils.parse as parse
+import smtracker.utils.systems as systems
+
+# The file extension of each output's reports
+EXTENSIONS = {'html': '.html', 'html-virtual': '.html', 'plain': '.txt',
+              'csv': '.csv', 'jsonl': '.jsonl'}
+
+# The name of the index page, inside the destination folder
+INDEX_NAME = "index.html"
+
+
+def get_report_names(profiles, output):
+    """Returns a file name for the report of each profile, named after the
+    folder it is in (e.g. 00000000.html for LocalProfiles/00000000)."""
+    names = []
+    taken = set()
+    for path in profiles:
+        folder = os.path.basename(os.path.dirname(os.path.abspath(path)))
+        base = folder or "profile"
+        name = base
+        copy = 1
+        while name.lower() in taken:
+            copy += 1
+            name = "{}-{}".format(base, copy)
+        taken.add(name.lower())
+        names.append(name + EXTENSIONS[output])
+    return names
+
+
+def get_jobs():
+    """Returns how many processes the machine can run at once."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def init_worker(systems_path):
+    """Loads the user's grading systems in a worker process."""
+    systems.load_user_systems(systems_path)
+
+
+def write_report(job):
+    """Parses, grades and writes the report of a single profile. Runs in a
+    worker process.
+
+    Arguments:
+    job -- a (path, dest, output, mode, difficulties, theme) tuple
+
+    Returns a dict describing the profile for the index page. Errors are
+    returned in its 'error' key instead of being raised, so a broken profile
+    doesn't stop the others.
+    """
+    path, dest, output, mode, difficulties, theme = job
+    summary = {'path': path, 'report': os.path.basename(dest), 'name': None,
+               'last_played': None, 'error': None}
+    try:
+        stats = parse.StatsFile(path)
+        summary['name'] = parse.get_profile_name(stats.header)
+        summary['last_played'] = parse.get_last_played(stats.header)
+
+        # Every output streams the file, like they do on their own
+        if output == "html":
+            import smtracker.output.html as html
+            html.save(stats, mode, difficulties, theme, dest)
+        elif output == "html-virtual":
+            import smtracker.output.virtual as virtual
+            virtual.save(stats, mode, difficulties, theme, dest)
+        elif output == "plain":
+            import smtracker.output.plain as plain
+            with open(dest, 'w') as dest_file:
+                with contextlib.redirect_stdout(dest_file):
+                    plain.report(stats, mode, difficulties, theme)
+        elif output == "csv":
+            import smtracker.output.export as export
+            export.save_csv(stats, mode, difficulties, theme, dest)
+        elif output == "jsonl":
+            import smtracker.output.export as export
+            export.save_jsonl(stats, mode, difficulties, theme, dest)
+    except (OSError, ValueError, etree.ParseError) as error:
+        # A file can be broken halfway through, after part of its report
+        # was written
+        summary['error'] = str(error)
+        with contextlib.suppress(OSError):
+            os.remove(dest)
+    return summary
+
+
+def save_index(summaries, dest):
+    """Writes the index page, linking to the report of every profile.
+
+    Arguments:
+    summaries -- the write_report() of every profile
+    dest      -- the folder the reports are in
+    """
+    import smtracker.output.html as html
+    template = html.get_template('index.html')
+    with open(os.path.join(dest, INDEX_NAME), 'w') as index_file:
+        template.stream(profiles=summaries).dump(index_file)
+
+
+def save(paths, output, mode, difficulties, theme, dest, jobs=None,
+         systems_path=None):
+    """Writes a report for every profile found in paths to the dest folder,
+    plus an index page. Returns the summaries of every profile.
+
+    Arguments:
+    paths        -- Stats.xml files, or folders with profiles in them
+    output       -- the output to use for each report (see EXTENSIONS)
+    mode         -- the game mode to output scores from
+    difficulties -- the difficulties which should be printed
+    theme        -- which metrics should be used for printing grades
+    dest         -- the folder to write the reports to
+    jobs         -- how many processes to use (defaults to get_jobs())
+    systems_path -- the file the user's grading systems were read from
+    """
+    if output not in EXTENSIONS:
+        sys.exit("Error: {} can't be used for batch reports".format(output))
+
+    profiles = parse.find_profiles(paths)
+    if not profiles:
+        sys.exit("Error: Could not find a Stats.xml file")
+
+    os.makedirs(dest, exist_ok=True)
+    job_list = [(path, os.path.join(dest, name), output, mode, difficulties,
+                 theme)
+                for path, name in zip(profiles, get_report_names(profiles,
+                                                                 output))]
+
+    jobs = min(jobs or get_jobs(), len(job_list))
+    if jobs == 1:
+        # Not worth starting a process for
+        summaries = [write_report(job) for job in job_list]
+    else:
+        with ProcessPoolExecutor(jobs, initializer=init_worker,
+                                 initargs=(systems_path,)) as executor:
+            summaries = list(executor.map(write_report, job_list))
+
+    save_index(summaries, dest)
+    return summaries
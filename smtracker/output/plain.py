@@ -18,43 +18,122 @@
 """A plain text interface for visualizing your scores."""
 
 import sys
+import smtracker.utils.diff as diff
 import smtracker.utils.format as smformat
 import smtracker.utils.parse as parse
+import smtracker.utils.timing as timing
 
 
 def report(stats, mode, difficulties, theme):
-    """Prints the plain text report."""
+    """Prints the plain text report.
+
+    Arguments:
+    stats        -- a parse.StatsFile for the Stats.xml file
+    mode         -- the game mode to output scores from
+    difficulties -- the difficulties which should be printed
+    theme        -- which metrics should be used for printing grades
+    """
 
     if stats is None:
         sys.exit("Error: Could not find a Stats.xml file")
 
-    displayname = parse.get_profile_name(stats)
-    lastplayed = parse.get_last_played(stats)
+    displayname = parse.get_profile_name(stats.header)
+    lastplayed = parse.get_last_played(stats.header)
     print("Profile name is " + displayname)
     print("Last played date was " + lastplayed)
 
-    for song in stats.find("SongScores"):
-        location = song.attrib['Dir'].split('/')
+    for song_dir, records in timing.timed("extract", stats):
+        location = song_dir.split('/')
         title = location[2]
         group = location[1]
         print(group + " - " + title)
 
-        step_counter = 0
-        for diff in difficulties:
-            # IndexError is raised after we reach the final <Step> on the song
-            # using step_counter
-            try:
-                if (song[step_counter].attrib['Difficulty'] == diff and
-                        song[step_counter].attrib['StepsType'] == mode):
-                    try:
-                        grade = smformat.highscore_grade(song[step_counter], theme)
-                        percent = float(parse.highscore_stat(song[step_counter],
-                                                             "PercentDP")) * 100
-                        print('+++ {:10}: {:3} ({:.2f})'.format(diff, grade, percent))
-                    except AttributeError:
-                        print("--- " + diff)
-                    step_counter = step_counter + 1
-                else:
-                    print("--- " + diff)
-            except IndexError:
-                print("--- " + diff)
+        charts = parse.index_records(records)
+        for difficulty in difficulties:
+            record = charts.get((mode, difficulty))
+            if record is not None and record.has_score():
+                grade = smformat.highscore_grade(record, theme)
+                percent = record.percent_dp * 100
+                print('+++ {:10}: {:3} ({:.2f})'.format(difficulty, grade,
+                                                       percent))
+            else:
+                print("--- " + difficulty)
+
+
+def leaderboard(board, top, rival=None):
+    """Prints how the profiles of a rivals.Leaderboard compare.
+
+    Arguments:
+    board -- the rivals.Leaderboard to print
+    top   -- how many scores to print for each chart
+    rival -- the profile whose rivals should be printed (the first one, if
+             None)
+    """
+    profiles = board.profiles
+    print("Comparing {} profiles on {} charts".format(len(profiles),
+                                                      len(board.keys)))
+
+    print("Standings:")
+    for place, standing in enumerate(board.standings(), 1):
+        print('{:3}. {:20} {:5} charts, {:5} first, {}W/{}L/{}T ({:.2f})'
+              .format(place, profiles[standing.profile], standing.charts,
+                      standing.first_places, standing.wins, standing.losses,
+                      standing.ties, standing.average * 100))
+
+    if len(profiles) > 1:
+        profile = 0 if rival is None else board.find_profile(rival)
+        print("Rivals of " + profiles[profile] + ":")
+        for rivalry in board.rivals(profile):
+            print('    {:20} {:5} charts, {}W/{}L/{}T'.format(
+                profiles[rivalry.profile], rivalry.charts, rivalry.wins,
+                rivalry.losses, rivalry.ties))
+
+    for song_dir, difficulty, players, entries in board.iter_charts(top):
+        location = song_dir.split('/')
+        print('{} - {} ({}, {} players)'.format(location[1], location[2],
+                                                difficulty, players))
+        for entry in entries:
+            print('{:3}. {:20} {:3} ({:.2f})'.format(
+                entry.rank, profiles[entry.profile], entry.grade,
+                entry.percent_dp * 100))
+
+
+# The mark printed before each kind of diff.Change
+DIFF_MARKS = {'improved': '+', 'worse': '-', 'new': '*', 'changed': '~',
+              'missing': '?'}
+
+
+def diff_report(score_diff, theme):
+    """Prints the charts whose scores changed between two Stats.xml files,
+    as they are found.
+
+    Arguments:
+    score_diff -- the diff.ScoreDiff of the two files
+    theme      -- which metrics should be used for printing grades
+    """
+    print("Profile name is " + parse.get_profile_name(score_diff.new.header))
+    print("Comparing scores from {} to {}".format(
+        parse.get_last_played(score_diff.old.header),
+        parse.get_last_played(score_diff.new.header)))
+
+    for change in score_diff:
+        location = change.song_dir.split('/')
+        old_grade, new_grade = score_diff.get_grades(change, theme)
+        line = '{} {} - {} ({}): '.format(DIFF_MARKS[change.kind],
+                                          location[1], location[2],
+                                          change.difficulty)
+        if change.old is None:
+            line += 'new {} ({:.2f})'.format(new_grade,
+                                             change.new.percent_dp * 100)
+        elif change.new is None:
+            line += '{} ({:.2f}), no score now'.format(
+                old_grade, change.old.percent_dp * 100)
+        else:
+            line += '{} -> {} ({:.2f} -> {:.2f}, {:+.2f})'.format(
+                old_grade, new_grade, change.old.percent_dp * 100,
+                change.new.percent_dp * 100,
+                diff.get_percent_delta(change) * 100)
+        print(line)
+
+    print(", ".join("{} {}".format(count, kind)
+                    for kind, count in score_diff.counts.items()))
@@ -19,183 +19,487 @@
 
 import sys
 import os
-import xml.etree.ElementTree as etree
 import functools
+import operator
+import re
 from importlib.resources import files, as_file
 
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QLabel, QComboBox, QLineEdit,
-                             QTableWidget, QTableWidgetItem, QHBoxLayout,
-                             QVBoxLayout, QAction, QMessageBox, QFileDialog,
-                             QAbstractItemView, qApp, QApplication)
-from PyQt5.QtCore import Qt, QSize
-from PyQt5.QtGui import QIcon
+                             QTableView, QHBoxLayout, QVBoxLayout, QAction,
+                             QMessageBox, QFileDialog, QAbstractItemView, qApp,
+                             QApplication, QTabWidget)
+from PyQt5.QtCore import (Qt, QSize, QAbstractTableModel, QModelIndex,
+                          QSortFilterProxyModel, QThread, pyqtSignal)
+from PyQt5.QtGui import QIcon, QPixmap
 
 import smtracker
+import smtracker.utils.batch as batch
+import smtracker.utils.cache as cache
 import smtracker.utils.format as smformat
+import smtracker.utils.highscores as highscores
 import smtracker.utils.parse as parse
-import smtracker.utils.score as score
+import smtracker.utils.systems as systems
+import smtracker.utils.timing as timing
 import smtracker.output.html as html
 
 from smtracker.images import itg, sm5, sm51
 
 
+# Packages with grade icons for each grading system
+ICON_PACKAGES = {'sm5': sm5, 'sm5.1': sm51, 'itg': itg}
+
+# Grade icons already decoded, keyed by grading system and then by grade
+_GRADE_ICONS = {}
+
+# The player box item which shows the scores of every player
+EVERYONE = "(everyone)"
+
+
+def get_grade_icons(theme):
+    """Returns a dict with a QIcon for each grade of a grading system.
+
+    Every icon of the system is decoded the first time it is asked for, and
+    the same QIcons are shared by every table afterwards.
+    """
+    try:
+        return _GRADE_ICONS[theme]
+    except KeyError:
+        pass
+
+    icons = {}
+    for source in files(ICON_PACKAGES[theme]).iterdir():
+        if source.name.endswith(".png"):
+            with as_file(source) as image:
+                icons[source.name[:-4]] = QIcon(QPixmap(str(image)))
+    _GRADE_ICONS[theme] = icons
+    return icons
+
+
+class ScoreModel(QAbstractTableModel):
+    """A table model with the scores of a parse.StatsFile.
+
+    Cells aren't stored anywhere: data() builds whatever the view asks for,
+    for the rows it is showing, from the score records and their grades.
+    """
+
+    def __init__(self, difficulties, parent=None):
+        """Creates an empty model."""
+        super().__init__(parent)
+        self.difficulties = difficulties   # Tracked difficulties
+        self.header = ["Group", "Title"] + difficulties
+
+        self.stats = None                  # parse.StatsFile, graded
+        self.score_index = {}              # Position of a record in grades
+        self.mode = None                   # Gamemode
+        self.theme = None                  # Grading system
+        self.icons_enabled = True          # Icons
+
+        # A (group, title, cells, group_key, title_key) tuple for each row,
+        # where cells has a ScoreRecord (or None) for each tracked difficulty,
+        # and the keys are the lowercase group and title, for filtering
+        self.rows = []
+        # The rows already built for each game mode. Grading systems
+        # and icons don't change which record goes in each cell, so they
+        # aren't part of the key.
+        self.row_cache = {}
+        # A (song_dir, parse.index_records()) tuple for each song, which
+        # every game mode's rows are built from
+        self.charts = []
+        # The row_cache, charts and score_index of every StatsFile set
+        # before, so going back to one doesn't match its records again
+        self.saved = {}
+
+    def set_stats(self, stats):
+        """Sets a new parse.StatsFile, which should already be graded."""
+        if self.stats is not None:
+            self.saved[self.stats] = (self.row_cache, self.charts,
+                                      self.score_index)
+        self.stats = stats
+        if stats in self.saved:
+            self.row_cache, self.charts, self.score_index = self.saved[stats]
+            return
+
+        self.row_cache = {}
+        self.charts = [(song_dir, parse.index_records(records))
+                       for song_dir, records in self.stats]
+        records = self.stats.scored_records()
+        self.score_index = {record: index for index, record in enumerate(records)}
+
+    def forget_stats(self):
+        """Forgets the rows of every StatsFile set before the current one."""
+        self.saved = {}
+
+    def build_rows(self):
+        """Matches the records of each song with the tracked difficulties of
+        the current game mode, unless that was already done for this mode."""
+        self.beginResetModel()
+        if self.mode in self.row_cache:
+            self.rows = self.row_cache[self.mode]
+            self.endResetModel()
+            return
+
+        self.rows = []
+        for song_dir, charts in self.charts:
+            # Get the song's group and title
+            # location[0] should always be "Songs"
+            location = song_dir.split('/')
+
+            # Difficulties the song has no scores for get an empty cell
+            cells = [charts.get((self.mode, diff)) for diff in self.difficulties]
+
+            self.rows.append((location[1], location[2], cells,
+                              location[1].lower(), location[2].lower()))
+        self.row_cache[self.mode] = self.rows
+        self.endResetModel()
+
+    def refresh(self):
+        """Tells the view every cell has changed, after changing the grading
+        system or the icons."""
+        if self.rows:
+            self.dataChanged.emit(self.index(0, 0),
+                                  self.index(len(self.rows) - 1, len(self.header) - 1))
+
+    def rowCount(self, parent=QModelIndex()):
+        """Returns the number of songs in the table."""
+        if parent.isValid():
+            return 0
+        return len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        """Returns the number of columns in the table."""
+        if parent.isValid():
+            return 0
+        return len(self.header)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        """Returns the group, title and difficulty column headers."""
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.header[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        """Returns the contents of a cell for the role the view asks for."""
+        if not index.isValid():
+            return None
+
+        group, title, cells = self.rows[index.row()][:3]
+        if index.column() == 0:
+            return group if role == Qt.DisplayRole else None
+        if index.column() == 1:
+            return title if role == Qt.DisplayRole else None
+
+        record = cells[index.column() - 2]
+        if record is None:
+            return None
+
+        # A Song may have been played, but have no score (AutoPlay,
+        # PlayerAutoPlay)
+        if not record.has_score():
+            if role == Qt.DisplayRole:
+                return '[no score]'
+            if role == Qt.TextAlignmentRole:
+                return Qt.AlignCenter
+            return None
+
+        has_icon = self.icons_enabled is True and self.theme in ICON_PACKAGES
+        if role == Qt.DisplayRole:
+            percent = record.percent_dp * 100
+            if has_icon is True:
+                return '{:.2f}%'.format(percent)
+            return '{} ({:.2f}%)'.format(self.grade(record), percent)
+        if role == Qt.DecorationRole and has_icon is True:
+            return get_grade_icons(self.theme).get(self.grade(record))
+        if role == Qt.ToolTipRole:
+            return self.tooltip(record)
+        return None
+
+    def grade(self, record):
+        """Returns the grade of a record in the current grading system."""
+        return self.stats.grades['grades'][self.theme][self.score_index[record]]
+
+    def tooltip(self, record):
+        """Returns the tooltip for a record's cell."""
+        tooltip = """{w1}: {w1_count}
+{w2}: {w2_count}
+{w3}: {w3_count}
+{w4}: {w4_count}
+{w5}: {w5_count}
+{miss}: {miss_count}
+Modifiers: {modifiers}
+Played: {played}""".format(
+        w1=smformat.get_judgment_name(self.theme, 'W1'), w1_count=record.W1,
+        w2=smformat.get_judgment_name(self.theme, 'W2'), w2_count=record.W2,
+        w3=smformat.get_judgment_name(self.theme, 'W3'), w3_count=record.W3,
+        w4=smformat.get_judgment_name(self.theme, 'W4'), w4_count=record.W4,
+        w5=smformat.get_judgment_name(self.theme, 'W5'), w5_count=record.W5,
+        miss=smformat.get_judgment_name(self.theme, 'Miss'), miss_count=record.Miss,
+        modifiers=record.modifiers,
+        played=record.date_time)
+
+        system = systems.get_system(self.theme)
+        if system.score_label is not None:
+            # Scores without notes have no score
+            score = self.stats.grades['scores'][self.theme][
+                self.score_index[record]]
+            if score is not None:
+                tooltip = tooltip + "\n{}: {}".format(system.score_label,
+                                                      score)
+        return tooltip
+
+    def row_matches(self, row, terms):
+        """Returns True if a row matches every term of a filter.
+
+        Arguments:
+        row   -- the position of the row in self.rows
+        terms -- a list of terms from parse_filter()
+        """
+        cells, group_key, title_key = self.rows[row][2:]
+        for kind, compare, value in terms:
+            if kind == 'title':
+                if value not in title_key:
+                    return False
+            elif kind == 'group':
+                if value not in group_key:
+                    return False
+            else:
+                records = [cell for cell in cells if cell is not None and cell.has_score()]
+                if kind == 'grade':
+                    matches = (compare(self.grade(record).lower(), value)
+                               for record in records)
+                else:
+                    matches = (compare(record.percent_dp * 100, value)
+                               for record in records)
+                if not any(matches):
+                    return False
+        return True
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """Sorts the rows by group, title, or by the percentage of a
+        difficulty (songs without a score come first)."""
+        if column == 0 or column == 1:
+            def key(row):
+                return row[column]
+        else:
+            def key(row):
+                record = row[2][column - 2]
+                if record is None or not record.has_score():
+                    return -1.0
+                return record.percent_dp
+
+        self.layoutAboutToBeChanged.emit()
+        self.rows.sort(key=key, reverse=order == Qt.DescendingOrder)
+        self.layoutChanged.emit()
+
+
+# Comparisons allowed in a "percent" filter term
+FILTER_OPERATORS = {'>=': operator.ge, '<=': operator.le, '>': operator.gt,
+                    '<': operator.lt, '=': operator.eq}
+
+FILTER_TERM = re.compile(r"^(group|grade|percent)(>=|<=|>|<|=|:)(.+)$")
+
+
+def parse_filter(text):
+    """Turns the contents of the filterbox into a list of (kind, compare,
+    value) terms, which a row must all match to be shown.
+
+    Words can be:
+    group:TEXT   -- the song's group contains TEXT
+    grade:GRADE  -- any difficulty has GRADE in the current grading system
+    percent>N    -- any difficulty has a percentage above N (also >=, <, <=, =)
+
+    Every other word is part of a text that the song's title must contain.
+    Matching ignores case.
+    """
+    terms = []
+    title = []
+    for word in text.lower().split():
+        match = FILTER_TERM.match(word)
+        if match is None:
+            title.append(word)
+            continue
+
+        kind, sign, value = match.groups()
+        if kind == 'percent' and sign != ':':
+            try:
+                terms.append((kind, FILTER_OPERATORS[sign], float(value)))
+            except ValueError:
+                title.append(word)
+        elif kind != 'percent' and sign == ':':
+            terms.append((kind, operator.eq, value))
+        else:
+            title.append(word)
+
+    if title:
+        terms.insert(0, ('title', None, " ".join(title)))
+    return terms
+
+
+class ScoreFilter(QSortFilterProxyModel):
+    """Hides the rows of a ScoreModel which don't match a filter, without
+    touching the model itself."""
+
+    def __init__(self, parent=None):
+        """Creates a filter which shows every row."""
+        super().__init__(parent)
+        self.terms = []
+
+    def set_filter(self, text):
+        """Sets the filter to the contents of the filterbox."""
+        self.terms = parse_filter(text)
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        """Returns True if a row of the model should be shown."""
+        if not self.terms:
+            return True
+        return self.sourceModel().row_matches(source_row, self.terms)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """Lets the model sort its own rows, which is much faster than
+        comparing them one pair at a time."""
+        self.sourceModel().sort(column, order)
+
+
+class ProfileFinder(QThread):
+    """Looks for local profiles in a thread of its own, reading only the
+    header of each Stats.xml file for the profile's name."""
+
+    # Emitted with the path and the name of each profile found
+    found = pyqtSignal(str, str)
+
+    def __init__(self, folder, parent=None):
+        """Creates a finder for the profiles in a LocalProfiles folder."""
+        super().__init__(parent)
+        self.folder = folder
+
+    def run(self):
+        """Emits found for every readable profile in the folder."""
+        if os.path.isdir(self.folder) is False:
+            return
+
+        for profile in sorted(os.listdir(self.folder)):
+            if self.isInterruptionRequested():
+                return
+            path = os.path.join(self.folder, profile, "Stats.xml")
+            try:
+                name = parse.get_profile_name(parse.read_header(path))
+            except (OSError, ValueError, AttributeError):
+                continue
+            if name is None:
+                name = "Unknown Name ({path})".format(path=profile)
+            self.found.emit(path, name)
+
+    def stop(self):
+        """Stops looking for profiles, waiting for the profile being read."""
+        self.requestInterruption()
+        self.wait()
+
+
 class Viewer(QMainWindow):
     """The main window for the application."""
 
-    def __init__(self, stats, mode, difficulties, theme):
+    def __init__(self, stats, mode, difficulties, theme, use_cache=True):
         """Initializes basic information about the Viewer class."""
         super().__init__()
 
         ### Initialize parameters passed from smtracker.py
-        self.stats = stats                 # XML tree
+        self.stats = stats                 # parse.StatsFile
+        self.profile = stats               # The file's own StatsFile
+        self.players = None                # highscores.PlayerIndex
         self.mode = mode                   # Gamemode
         self.difficulties = difficulties   # Tracked difficulties
+        self.theme = theme                 # Grading system
+        self.use_cache = use_cache         # Whether the cache can be used
         self.filter = None
+        # Column widths for each (mode, theme, icons_enabled) already shown
+        self.column_widths = {}
 
         ### Initialize interface options
         self.icons_enabled = True          # Icons
 
         ### Create an empty table
-        if self.stats is not None:
-            song_count = len(self.stats.find("SongScores"))
-            self.table = QTableWidget(song_count, len(self.difficulties) + 2)
-        else:
-            self.table = QTableWidget(0, len(self.difficulties) + 2)
+        # The model only builds the cells the view is showing
+        self.model = ScoreModel(self.difficulties, self)
+        self.proxy = ScoreFilter(self)
+        self.proxy.setSourceModel(self.model)
+        self.table = QTableView()
+        self.table.setModel(self.proxy)
 
         # Set some basic table attributes
         self.table.setIconSize(QSize(32, 32))
         self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.table.setSelectionMode(QAbstractItemView.NoSelection)
+        self.table.setSortingEnabled(True)
 
-        table_header = ["Group", "Title"]
-        table_header.extend(self.difficulties)
+        # Decode the icons for the starting grading system right away
+        if self.theme in ICON_PACKAGES:
+            get_grade_icons(self.theme)
 
-        # Sets the header cells
-        for head in table_header:
-            where = table_header.index(head)
-            headeritem = QTableWidgetItem()
-            headeritem.setText(head)
-            self.table.setHorizontalHeaderItem(where, headeritem)
+        # Started on a player's scores (from --player)
+        if isinstance(stats, highscores.PlayerStats):
+            self.players = stats.players
+            self.profile = self.players.stats
 
-        self.theme = theme
+        if self.stats is not None:
+            self.read_stats()
         self.init_ui()
 
 
-    def init_table(self):
-        """Generates a table with the song scores."""
-
-        # Prepare table for inserting items
-        self.table.clearContents()
-        self.table.setSortingEnabled(False)
-
-        # Current table row
-        current_row = 0
-        for song in self.stats.find("SongScores"):
-            # Current table row
-            current_column = 0
-
-            # Get the song's group and title
-            # location[0] should always be "Songs"
-            location = song.attrib['Dir'].split('/')
+    def read_stats(self):
+        """Loads the scores from self.stats and grades them with every grading
+        system, so switching between systems doesn't have to grade anything."""
+        if self.stats.songs is None:
+            if self.use_cache:
+                cache.load_stats(self.stats)
+            else:
+                with timing.phase("extract"):
+                    self.stats.load()
+        if self.stats.grades is None:
+            with timing.phase("grade"):
+                self.stats.grades = batch.grade_records(self.stats.scored_records())
+        with timing.phase("index"):
+            self.model.set_stats(self.stats)
 
-            if self.filter is not None and self.filter.lower() not in location[2].lower():
-                continue
 
-            # Create group cell
-            group = QTableWidgetItem(location[1])
-            self.table.setItem(current_row, current_column, group)
-            current_column = current_column + 1
-
-            # Create title cell
-            title = QTableWidgetItem(location[2])
-            self.table.setItem(current_row, current_column, title)
-            current_column = current_column + 1
-
-            # step_counter will be used for traversing the scores in a song
-            step_counter = 0
-            for diff in self.difficulties:
-                try:
-                    if (song[step_counter].attrib['Difficulty'] == diff and
-                        song[step_counter].attrib['StepsType'] == self.mode):
-                        try:
-                            grade = smformat.highscore_grade(song[step_counter], self.theme)
-                            percent = float(parse.highscore_stat(song[step_counter], "PercentDP")) * 100
-
-                            has_icon = False
-                            if self.theme == "sm5" and self.icons_enabled is True:
-                                source = files(sm5).joinpath(grade + ".png")
-                                has_icon = True
-                            elif self.theme == "sm5.1" and self.icons_enabled is True:
-                                source = files(sm51).joinpath(grade + ".png")
-                                has_icon = True
-                            elif self.theme == "itg" and self.icons_enabled is True:
-                                source = files(itg).joinpath(grade + ".png")
-                                has_icon = True
-
-                            if has_icon is True:
-                                cell = QTableWidgetItem('{:.2f}%'.format(percent))
-                                with as_file(source) as image:
-                                    cell.setIcon(QIcon(str(image)))
-                            else:
-                                cell = QTableWidgetItem('{} ({:.2f}%)'.format(grade, percent))
-
-                            # Get the timings for our song
-                            timings = parse.highscore_timings(song[step_counter])
-
-                            # Generate tooltip
-                            tooltip = """{w1}: {w1_count}
-{w2}: {w2_count}
-{w3}: {w3_count}
-{w4}: {w4_count}
-{w5}: {w5_count}
-{miss}: {miss_count}
-Modifiers: {modifiers}
-Played: {played}""".format(
-        w1=smformat.get_judgment_name(self.theme, 'W1'), w1_count=timings['W1'],
-        w2=smformat.get_judgment_name(self.theme, 'W2'), w2_count=timings['W2'],
-        w3=smformat.get_judgment_name(self.theme, 'W3'), w3_count=timings['W3'],
-        w4=smformat.get_judgment_name(self.theme, 'W4'), w4_count=timings['W4'],
-        w5=smformat.get_judgment_name(self.theme, 'W5'), w5_count=timings['W5'],
-        miss=smformat.get_judgment_name(self.theme, 'Miss'), miss_count=timings['Miss'],
-        modifiers=parse.highscore_stat(song[step_counter], "Modifiers"),
-        played=parse.highscore_stat(song[step_counter], "DateTime"))
-
-                            if self.theme == "supernova2":
-                                tooltip = tooltip + "\nDDR SN2 Score: {}".format(score.calculate_score_supernova2(song[step_counter]))
-                            if self.theme == "ddra":
-                                tooltip = tooltip + "\nDDR A Score: {}".format(score.calculate_score_ddra(song[step_counter]))
-                            if self.theme == "iidx":
-                                tooltip = tooltip + "\nIIDX EX Score: {}".format(score.calculate_score_iidx(song[step_counter]))
-
-
-                            cell.setToolTip(tooltip)
-                            self.table.setItem(current_row, current_column, cell)
-                        # This exception is reached if a Song was played, but
-                        # has no score (AutoPlay, PlayerAutoPlay)
-                        except AttributeError:
-                            cell = QTableWidgetItem('[no score]')
-                            cell.setTextAlignment(Qt.AlignCenter)
-                            self.table.setItem(current_row, current_column, cell)
-                        step_counter = step_counter + 1
-                    # If there are no scores for the current difficulty,
-                    # add an empty cell instead
-                    else:
-                        cell = QTableWidgetItem()
-                        self.table.setItem(current_row, current_column, cell)
-                # This exception is reached if we already reached the last
-                # score on a song (using step_counter)
-                except IndexError:
-                    cell = QTableWidgetItem()
-                    self.table.setItem(current_row, current_column, cell)
-                current_column = current_column + 1
-            current_row = current_row + 1
+    def init_table(self):
+        """Generates a table with the song scores."""
+        self.model.mode = self.mode
+        self.model.theme = self.theme
+        self.model.icons_enabled = self.icons_enabled
+        with timing.phase("build rows"):
+            self.model.build_rows()
 
         # Final table adjustments
-        self.table.resizeColumnsToContents()
-        self.table.setSortingEnabled(True)
+        with timing.phase("resize columns"):
+            self.resize_columns()
         self.table.sortByColumn(0, Qt.AscendingOrder)
 
 
+    def refresh_table(self):
+        """Redraws the table after changing the grading system or the icons,
+        without matching songs and difficulties again."""
+        self.model.theme = self.theme
+        self.model.icons_enabled = self.icons_enabled
+        self.model.refresh()
+        # Grade filters depend on the grading system
+        if any(term[0] == 'grade' for term in self.proxy.terms):
+            self.proxy.invalidateFilter()
+        self.resize_columns()
+
+
+    def resize_columns(self):
+        """Fits the columns to their contents, reusing the widths found the
+        last time this game mode, grading system and icon setting were used."""
+        key = (self.mode, self.theme, self.icons_enabled)
+        if key in self.column_widths:
+            for column, width in enumerate(self.column_widths[key]):
+                self.table.setColumnWidth(column, width)
+        else:
+            self.table.resizeColumnsToContents()
+            self.column_widths[key] = [self.table.columnWidth(column) for column
+                                       in range(self.model.columnCount())]
+
+
     def combobox_activated(self, combobox):
         """Sets the current game mode and regenerates the table."""
         self.mode = combobox.currentText()
@@ -203,15 +507,42 @@ Played: {played}""".format(
 
 
     def themebox_activated(self, combobox):
-        """Sets the current grading system and regenerates the table."""
+        """Sets the current grading system and redraws the table."""
         self.theme = combobox.currentText()
-        self.init_table()
+        self.refresh_table()
+
+
+    def playerbox_activated(self, playerbox):
+        """Shows the scores of the player picked on the player box, or of
+        every player."""
+        name = playerbox.currentText()
+        if name == EVERYONE:
+            self.show_stats(self.profile)
+        else:
+            self.show_stats(self.players.get_stats(name))
+
+
+    def update_players(self):
+        """Lists the players of a machine profile on the player box, reading
+        every HighScore of the profile if that wasn't done yet."""
+        self.playerbox.clear()
+        self.playerbox.addItem(EVERYONE)
+        if (self.players is None and self.profile is not None and
+                highscores.is_machine_profile(self.profile)):
+            with timing.phase("index players"):
+                self.players = highscores.PlayerIndex(self.profile)
+
+        if self.players is not None:
+            self.playerbox.addItems(self.players.get_names())
+        if isinstance(self.stats, highscores.PlayerStats):
+            self.playerbox.setCurrentText(self.stats.player)
+        self.playerbox.setEnabled(self.playerbox.count() > 1)
 
 
     def filterbox_activated(self, filterbox):
         """Filters the table based on the contents of the filterbox."""
         self.filter = filterbox.text()
-        self.init_table()
+        self.proxy.set_filter(self.filter)
 
 
     def about_box(self):
@@ -248,9 +579,9 @@ Played: {played}""".format(
 
     def set_statusbar(self):
         """Resets the application statusbar."""
-        displayname = parse.get_profile_name(self.stats)
-        lastplayed = parse.get_last_played(self.stats)
-        timeplayed = parse.get_session_seconds(self.stats)
+        displayname = parse.get_profile_name(self.stats.header)
+        lastplayed = parse.get_last_played(self.stats.header)
+        timeplayed = parse.get_session_seconds(self.stats.header)
         status = 'Profile: {} // Last played: {} // Total time played: {}'.format(
                 displayname, lastplayed, timeplayed)
         self.setStatusTip(status)
@@ -258,8 +589,20 @@ Played: {played}""".format(
 
     def set_stats(self, stats):
         """Sets a new Stats.xml file and regenerates the UI."""
+        self.profile = stats
+        self.players = None
+        self.column_widths = {}
+        self.show_stats(stats)
+        # Only after the new file is set, which saves the one before it
+        self.model.forget_stats()
+        self.update_players()
+
+
+    def show_stats(self, stats):
+        """Shows the scores of a StatsFile, which is only loaded and graded
+        the first time it's shown."""
         self.stats = stats
-        self.table.setRowCount(len(self.stats.find("SongScores")))
+        self.read_stats()
         self.init_table()
         self.set_statusbar()
 
@@ -270,19 +613,32 @@ Played: {played}""".format(
                                                 "to open", None, "StepMania stats "
                                                 "files (*.xml)")
         if filetuple[0]:
-            tempstats = etree.parse(filetuple[0]).getroot()
-            if tempstats.find("SongScores") is None:
-                QMessageBox.critical(self, "Error parsing file", "The selected "
-                                     "file is not a valid StepMania Stats.xml "
-                                     "file.")
-            else:
-                self.set_stats(tempstats)
+            self.open_stats(filetuple[0])
+
+
+    def open_stats(self, path):
+        """Opens a Stats.xml file and shows its scores."""
+        try:
+            tempstats = parse.StatsFile(path)
+        except (OSError, ValueError):
+            QMessageBox.critical(self, "Error parsing file", "The selected "
+                                 "file is not a valid StepMania Stats.xml "
+                                 "file.")
+        else:
+            self.set_stats(tempstats)
+
+
+    def add_profile(self, path, name):
+        """Adds a local profile found by the ProfileFinder to the profile menu."""
+        action = self.profile_menu.addAction(name)
+        action.triggered.connect(functools.partial(self.open_stats, path))
+        self.profile_menu.setEnabled(True)
 
 
     def toggle_icons(self, state):
-        """Sets icons_enabled and regenerates the table."""
+        """Sets icons_enabled and redraws the table."""
         self.icons_enabled = state
-        self.init_table()
+        self.refresh_table()
 
     def init_menubar(self):
         """Generates the main window menu bar."""
@@ -323,43 +679,28 @@ Played: {played}""".format(
         file_menu.addAction(open_action)
 
         # Create the profile submenu and add the machine profile item
-        profile_menu = file_menu.addMenu('Open &profile')
-        mp_action = profile_menu.addAction('Machine Profile')
+        self.profile_menu = file_menu.addMenu('Open &profile')
+        mp_action = self.profile_menu.addAction('Machine Profile')
 
         # Define the location for profiles
         profile_folder, mp_folder = parse.get_profile_location()
 
-        # Check if the machine profile exists
+        # Check if the machine profile exists; it's only read once it's picked
         if os.path.isfile(mp_folder + "Stats.xml") is True:
-            no_mp = False
             mp_action.setStatusTip('Open this machine\'s profile')
-            machine_profile = etree.parse(mp_folder + "Stats.xml").getroot()
-            mp_action.triggered.connect(lambda: self.set_stats(machine_profile))
+            mp_action.triggered.connect(functools.partial(self.open_stats,
+                                                          mp_folder + "Stats.xml"))
         else:
-            no_mp = True
             mp_action.setEnabled(False)
+            # Stays disabled unless the ProfileFinder finds a local profile
+            self.profile_menu.setEnabled(False)
 
-        # Check if there's any local profiles
-        if os.path.isdir(profile_folder) is True:
-            no_lp = False
-            profile_menu.addSeparator()
-            for profile in os.listdir(profile_folder):
-                try:
-                    tempstats = etree.parse(profile_folder + profile + "/Stats.xml").getroot()
-                except FileNotFoundError:
-                    continue
-                tempname = parse.get_profile_name(tempstats)
-                if tempname is None:
-                    tempname = "Unknown Name ({path})".format(path=profile)
-                action = profile_menu.addAction(tempname)
-                function = functools.partial(self.set_stats, tempstats)
-                action.triggered.connect(function)
-        else:
-            no_lp = True
-
-        # If there are no profiles at all, disable profile menu
-        if no_mp is True and no_lp is True:
-            profile_menu.setEnabled(False)
+        # Local profiles are looked for in the background, so the window
+        # doesn't have to wait for every profile to be read
+        self.profile_menu.addSeparator()
+        self.profile_finder = ProfileFinder(profile_folder, self)
+        self.profile_finder.found.connect(self.add_profile)
+        self.profile_finder.start()
 
         # Add the rest of the actions to the menubar
         file_menu.addAction(export_action)
@@ -376,7 +717,7 @@ Played: {played}""".format(
         """Initializes the user interface."""
         modes = ("dance-single", "dance-double", "pump-single", "pump-double",
                  "pump-halfdouble", "bm-single7", "bm-double7")
-        themes = ("sm5", "sm5.1", "itg", "supernova2", "ddra", "iidx")
+        themes = systems.get_names()
 
         # Combobox for game modes
         combobox = QComboBox()
@@ -391,10 +732,18 @@ Played: {played}""".format(
         themelabel = QLabel("Grading system:")
         themebox.activated.connect(lambda: self.themebox_activated(themebox))
 
+        # Players of a machine profile
+        self.playerbox = QComboBox()
+        playerlabel = QLabel("Player:")
+        self.playerbox.activated.connect(
+            lambda: self.playerbox_activated(self.playerbox))
+        self.update_players()
+
         # Filter text box
-        filterlabel = QLabel("Filter titles:")
+        filterlabel = QLabel("Filter:")
         filterbox = QLineEdit()
-        filterbox.editingFinished.connect(lambda: self.filterbox_activated(filterbox))
+        filterbox.setPlaceholderText("title, group:name, grade:AA, percent>95")
+        filterbox.textChanged.connect(lambda: self.filterbox_activated(filterbox))
 
         self.init_menubar()
 
@@ -406,6 +755,8 @@ Played: {played}""".format(
         hbox.addWidget(combobox, 1)
         hbox.addWidget(themelabel)
         hbox.addWidget(themebox, 1)
+        hbox.addWidget(playerlabel)
+        hbox.addWidget(self.playerbox, 1)
 
         filterhbox = QHBoxLayout()
         filterhbox.addWidget(filterlabel)
@@ -430,8 +781,199 @@ Played: {played}""".format(
         self.show()
 
 
-def run(stats, mode, difficulties, theme):
+    def closeEvent(self, event):
+        """Stops the ProfileFinder before the window goes away, since Qt
+        aborts if a thread is destroyed while it's still running."""
+        self.profile_finder.stop()
+        super().closeEvent(event)
+
+
+class TableModel(QAbstractTableModel):
+    """A table model with fixed rows, where each cell has a value to sort
+    by and the text to show for it."""
+
+    def __init__(self, header, rows, parent=None):
+        """Creates a model.
+
+        Arguments:
+        header -- the title of each column
+        rows   -- a list of rows, each with a (value, text) tuple per column
+        """
+        super().__init__(parent)
+        self.header = header
+        self.rows = rows
+
+    def rowCount(self, parent=QModelIndex()):
+        """Returns the number of rows in the table."""
+        if parent.isValid():
+            return 0
+        return len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        """Returns the number of columns in the table."""
+        if parent.isValid():
+            return 0
+        return len(self.header)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        """Returns the column headers."""
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.header[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        """Returns the text of a cell, or its value for sorting."""
+        if not index.isValid():
+            return None
+        value, text = self.rows[index.row()][index.column()]
+        if role == Qt.DisplayRole:
+            return text
+        if role == Qt.UserRole:
+            return value
+        return None
+
+
+def cell(value):
+    """Returns a TableModel cell showing a value as it is."""
+    return (value, str(value))
+
+
+def percent_cell(percent_dp):
+    """Returns a TableModel cell showing a PercentDP as a percentage."""
+    return (percent_dp, '{:.2f}%'.format(percent_dp * 100))
+
+
+class LeaderboardViewer(QMainWindow):
+    """A window comparing the profiles of a rivals.Leaderboard."""
+
+    def __init__(self, board, top, rival=None):
+        """Shows the standings, rivals and top scores of each chart.
+
+        Arguments:
+        board -- the rivals.Leaderboard to show
+        top   -- how many scores to show for each chart
+        rival -- the profile whose rivals should be shown (the first one,
+                 if None)
+        """
+        super().__init__()
+        self.board = board
+        self.top = top
+        self.rival = 0 if rival is None else board.find_profile(rival)
+        self.rivalbox = None
+        self.rivals_table = None
+        self.init_ui()
+
+    def make_table(self, header, rows):
+        """Returns a sortable QTableView with the rows of a TableModel."""
+        proxy = QSortFilterProxyModel(self)
+        proxy.setSortRole(Qt.UserRole)
+        proxy.setSourceModel(TableModel(header, rows, self))
+        table = QTableView()
+        table.setModel(proxy)
+        table.setSortingEnabled(True)
+        table.sortByColumn(0, Qt.AscendingOrder)
+        table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        table.verticalHeader().setVisible(False)
+        table.resizeColumnsToContents()
+        return table
+
+    def standings_rows(self):
+        """Returns the rows of the standings table."""
+        profiles = self.board.profiles
+        return [[cell(place), cell(profiles[standing.profile]),
+                 cell(standing.charts), cell(standing.first_places),
+                 cell(standing.wins), cell(standing.losses),
+                 cell(standing.ties), percent_cell(standing.average)]
+                for place, standing in enumerate(self.board.standings(), 1)]
+
+    def rivals_rows(self):
+        """Returns the rows of the rivals table."""
+        profiles = self.board.profiles
+        if len(profiles) < 2:
+            return []
+        return [[cell(profiles[rivalry.profile]), cell(rivalry.charts),
+                 cell(rivalry.wins), cell(rivalry.losses), cell(rivalry.ties)]
+                for rivalry in self.board.rivals(self.rival)]
+
+    def charts_rows(self):
+        """Returns the rows of the charts table, with a column for each of
+        the top scores of a chart."""
+        profiles = self.board.profiles
+        rows = []
+        for song_dir, diff, players, entries in self.board.iter_charts(
+                self.top):
+            location = song_dir.split('/')
+            row = [cell(location[1]), cell(location[2]), cell(diff),
+                   cell(players)]
+            for entry in entries:
+                row.append((entry.percent_dp, '{} - {} ({:.2f}%)'.format(
+                    profiles[entry.profile], entry.grade,
+                    entry.percent_dp * 100)))
+            row.extend([(-1.0, '')] * (self.top - len(entries)))
+            rows.append(row)
+        return rows
+
+    def rivalbox_activated(self, rivalbox):
+        """Shows the rivals of another profile."""
+        self.rival = rivalbox.currentIndex()
+        model = self.rivals_table.model()
+        model.sourceModel().beginResetModel()
+        model.sourceModel().rows = self.rivals_rows()
+        model.sourceModel().endResetModel()
+
+    def init_ui(self):
+        """Initializes the user interface."""
+        standings = self.make_table(
+            ["Place", "Profile", "Charts", "First places", "Wins", "Losses",
+             "Ties", "Average"], self.standings_rows())
+
+        self.rivalbox = QComboBox()
+        self.rivalbox.addItems(self.board.profiles)
+        self.rivalbox.setCurrentIndex(self.rival)
+        self.rivalbox.activated.connect(
+            lambda: self.rivalbox_activated(self.rivalbox))
+        self.rivals_table = self.make_table(
+            ["Profile", "Charts", "Wins", "Losses", "Ties"],
+            self.rivals_rows())
+        rivalhbox = QHBoxLayout()
+        rivalhbox.addWidget(QLabel("Rivals of:"))
+        rivalhbox.addWidget(self.rivalbox, 1)
+        rivalvbox = QVBoxLayout()
+        rivalvbox.addLayout(rivalhbox)
+        rivalvbox.addWidget(self.rivals_table)
+        rivals = QWidget()
+        rivals.setLayout(rivalvbox)
+
+        header = ["Group", "Title", "Difficulty", "Players"]
+        header.extend("#{}".format(rank) for rank in range(1, self.top + 1))
+        charts = self.make_table(header, self.charts_rows())
+
+        tabs = QTabWidget()
+        tabs.addTab(standings, "Standings")
+        tabs.addTab(rivals, "Rivals")
+        tabs.addTab(charts, "Charts")
+        self.setCentralWidget(tabs)
+
+        self.statusBar()
+        self.setStatusTip("Comparing {} profiles on {} charts".format(
+            len(self.board.profiles), len(self.board.keys)))
+        self.setWindowTitle('smtracker - Leaderboard')
+        self.resize(1200, 700)
+        self.show()
+
+
+def run_leaderboard(board, top, rival=None):
+    """Runs the leaderboard window. See LeaderboardViewer for the
+    arguments."""
+    app = QApplication(sys.argv)
+    with timing.phase("render"):
+        LeaderboardViewer(board, top, rival)
+    sys.exit(app.exec_())
+
+
+def run(stats, mode, difficulties, theme, use_cache=True):
     """Runs the user interface."""
     app = QApplication(sys.argv)
-    Viewer(stats, mode, difficulties, theme)
+    with timing.phase("render"):
+        Viewer(stats, mode, difficulties, theme, use_cache)
     sys.exit(app.exec_())
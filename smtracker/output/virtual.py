@@ -0,0 +1,175 @@
+#!/usr/bin/python3
+# Copyright (C) 2016 Renan Guilherme Lebre Ramos
+# This file is a part of smtracker.
+#
+# smtracker is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Functions for saving HTML reports for large libraries.
+
+The scores are saved in columns to a JavaScript file next to the report,
+and the page only draws the rows which are on screen. Libraries with many
+songs get a page for each group. Everything works offline, straight from
+the disk.
+"""
+
+import json
+import os
+
+import smtracker.utils.format as smformat
+import smtracker.utils.parse as parse
+import smtracker.utils.timing as timing
+import smtracker.output.html as html
+
+# Reports with more songs than this get a page for each group
+SPLIT_THRESHOLD = 5000
+
+# Judgments shown for each difficulty
+JUDGMENTS = ('W1', 'W2', 'W3', 'W4', 'W5', 'Miss')
+
+
+def new_columns(difficulties):
+    """Returns empty columns for the songs of a group."""
+    columns = {'title': [], 'scores': {}}
+    for diff in difficulties:
+        columns['scores'][diff] = {field: [] for field
+                                   in ('grade', 'percent') + JUDGMENTS}
+    return columns
+
+
+def collect_groups(stats, mode, difficulties, theme):
+    """Returns a dict with the columns for the songs of each group, in the
+    order groups are found in the Stats file.
+
+    Arguments:
+    stats        -- a parse.StatsFile for the Stats.xml file
+    mode         -- the game mode to output scores from
+    difficulties -- the difficulties which should be saved
+    theme        -- which metrics should be used for grades
+
+    Difficulties without a score have None in every column.
+    """
+    groups = {}
+    for song_dir, records in stats:
+        location = song_dir.split('/')
+        columns = groups.get(location[1])
+        if columns is None:
+            columns = groups[location[1]] = new_columns(difficulties)
+        columns['title'].append(location[2])
+
+        charts = parse.index_records(records)
+        for diff in difficulties:
+            record = charts.get((mode, diff))
+            column = columns['scores'][diff]
+            if record is not None and record.has_score():
+                column['grade'].append(smformat.highscore_grade(record, theme))
+                column['percent'].append(round(record.percent_dp * 100, 2))
+                for judgment in JUDGMENTS:
+                    column[judgment].append(getattr(record, judgment))
+            else:
+                for values in column.values():
+                    values.append(None)
+    return groups
+
+
+def write_data(path, groups, difficulties):
+    """Writes the columns of some groups to a JavaScript file, as a single
+    set of columns where each song has the position of its group.
+
+    Arguments:
+    path         -- the file to write
+    groups       -- a dict with the columns of each group to write
+    difficulties -- the difficulties in the columns
+    """
+    data = {'groups': list(groups), 'group': [], 'title': [],
+            'scores': new_columns(difficulties)['scores']}
+    for position, columns in enumerate(groups.values()):
+        data['group'].extend([position] * len(columns['title']))
+        data['title'].extend(columns['title'])
+        for diff in difficulties:
+            for field, values in columns['scores'][diff].items():
+                data['scores'][diff][field].extend(values)
+
+    # A script instead of a JSON file, since browsers won't fetch() files
+    # from the disk
+    with open(path, 'w', encoding='utf-8') as data_file:
+        data_file.write("window.SMTRACKER_DATA = ")
+        json.dump(data, data_file, separators=(',', ':'))
+        data_file.write(";\n")
+
+
+def write_page(path, context, data, index=None):
+    """Writes a page which shows the scores from a data file.
+
+    Arguments:
+    path    -- the page to write
+    context -- the variables shared by every page of the report
+    data    -- the data file, relative to the page
+    index   -- the page listing every group, relative to the page, if any
+    """
+    with open(path, 'w', encoding='utf-8') as page:
+        html.get_template('virtual.html').stream(
+            data=data, index=index, **context).dump(page)
+
+
+def save(stats, mode, difficulties, theme, dest='/tmp/sm.html'):
+    """Saves a report with the scores in separate files.
+
+    Arguments:
+    stats        -- a parse.StatsFile for the Stats.xml file
+    mode         -- the game mode to output scores from
+    difficulties -- the difficulties which should be printed
+    theme        -- which metrics should be used for printing grades
+    dest         -- where should the report's main page be saved; the rest
+                    of the report goes to a folder next to it, named after it
+                    with "_files" appended
+    """
+    if stats is None:
+        print("Error: Could not find a Stats.xml file")
+        return
+
+    with timing.phase("extract"):
+        groups = collect_groups(stats, mode, difficulties, theme)
+
+    base = os.path.splitext(os.path.basename(dest))[0]
+    files_name = base + "_files"
+    files_path = os.path.join(os.path.dirname(dest), files_name)
+    context = {'name': parse.get_profile_name(stats.header),
+               'last_played': parse.get_last_played(stats.header),
+               'difficulties': difficulties,
+               'judgments': [smformat.get_judgment_name(theme, judgment)
+                             for judgment in JUDGMENTS]}
+
+    with timing.phase("write"):
+        os.makedirs(files_path, exist_ok=True)
+        songs = sum(len(columns['title']) for columns in groups.values())
+        if songs <= SPLIT_THRESHOLD:
+            write_data(os.path.join(files_path, "scores.js"), groups,
+                       difficulties)
+            write_page(dest, context, files_name + "/scores.js")
+            return
+
+        # A page for each group, and a main page listing them
+        pages = []
+        for number, (group, columns) in enumerate(groups.items(), 1):
+            name = "group-{:04}".format(number)
+            write_data(os.path.join(files_path, name + ".js"),
+                       {group: columns}, difficulties)
+            write_page(os.path.join(files_path, name + ".html"), context,
+                       name + ".js", index="../" + os.path.basename(dest))
+            pages.append((group, files_name + "/" + name + ".html",
+                          len(columns['title'])))
+
+        with open(dest, 'w', encoding='utf-8') as page:
+            html.get_template('groups.html').stream(
+                pages=pages, **context).dump(page)
@@ -18,18 +18,25 @@
 """Initialization of smtracker and its options."""
 
 import argparse
+import cProfile
 import os
 import sys
-import xml.etree.ElementTree as etree
-
-import smtracker.output.plain as plain
-import smtracker.output.qt as qt
-import smtracker.output.html as html
 
+import smtracker.utils.cache as cache
+import smtracker.utils.highscores as highscores
+import smtracker.utils.history as history
 import smtracker.utils.parse as parse
+import smtracker.utils.systems as systems
+import smtracker.utils.timing as timing
 
 DIFFICULTIES = ["Beginner", "Easy", "Medium", "Hard", "Challenge"]
 
+# Where HTML reports are saved if -d isn't used
+HTML_DEST = "/tmp/sm.html"
+
+# Where batch reports are saved if -d isn't used
+BATCH_DEST = "/tmp/smtracker"
+
 
 def find_stats():
     """Returns the first LocalProfile, or else returns a MachineProfile."""
@@ -50,7 +57,7 @@ def get_argparser():
     """Creates an argparse parser."""
     parser = argparse.ArgumentParser(description='A StepMania Score Tracker')
     parser.add_argument('file', nargs='?', type=argparse.FileType('r'),
-                        default=find_stats(), help="the Stats.xml file to read "
+                        help="the Stats.xml file to read "
                         "(will read first available StepMania profile if not "
                         "specified)")
     parser.add_argument('-m', dest='mode', nargs='?', default='dance-single',
@@ -60,39 +67,256 @@ def get_argparser():
     parser.add_argument('-o', dest='output', nargs='?', default='qt',
                         const='qt',
                         help="the output to use (valid options are 'plain', "
-                        "'html' and 'qt', defaults to 'qt')")
+                        "'html', 'html-virtual', 'csv', 'jsonl' and 'qt', "
+                        "defaults to 'qt')")
     parser.add_argument('-t', dest='theme', nargs='?', default='sm5.1',
                         const='sm5.1',
                         help="what theme should be used for calculating grades "
-                        "(valid options are 'sm5', 'sm5.1', 'itg', 'supernova2' "
-                        "and 'ddra', defaults to 'sm5.1')")
+                        "(valid options are 'sm5', 'sm5.1', 'itg', 'supernova2', "
+                        "'ddra', 'iidx' and any from --systems, defaults to "
+                        "'sm5.1')")
     parser.add_argument('-i', dest='ignore', nargs='+',
                         help="ignore the specified difficulty")
-    parser.add_argument('-d', dest='dest', nargs='?', default='/tmp/sm.html',
-                        help="where should the output file be saved (only for "
-                        "html and plain outputs)")
+    parser.add_argument('-d', dest='dest', nargs='?',
+                        help="where should the output file be saved (html "
+                        "outputs default to /tmp/sm.html, and html-virtual "
+                        "also writes a folder next to it; csv and jsonl "
+                        "default to stdout)")
+    parser.add_argument('--no-cache', dest='cache', action='store_false',
+                        help="don't read or write parsed scores from the cache, "
+                        "which the qt output and --compare use (other outputs "
+                        "always stream the file)")
+    parser.add_argument('--ingest', dest='ingest', metavar='DATABASE',
+                        help="add every score from the Stats.xml file to a "
+                        "score history database and exit")
+    parser.add_argument('--history', dest='history', metavar='DATABASE',
+                        help="read the best scores of the Stats.xml file's "
+                        "profile from a score history database instead")
+    parser.add_argument('--systems', dest='systems', metavar='FILE',
+                        help="read extra grading systems from a JSON file "
+                        "(defaults to systems.json in smtracker's config "
+                        "folder, if it exists)")
+    parser.add_argument('--batch', dest='batch', nargs='+', metavar='PATH',
+                        help="write a report for every Stats.xml file in "
+                        "PATH (files, LocalProfiles folders or whole Save "
+                        "folders) to the -d folder (defaults to "
+                        "/tmp/smtracker), plus an index.html page")
+    parser.add_argument('-j', '--jobs', dest='jobs', type=int, metavar='N',
+                        help="how many profiles --batch works on at once "
+                        "(defaults to the number of cores)")
+    parser.add_argument('--compare', dest='compare', nargs='+',
+                        metavar='PATH',
+                        help="compare every Stats.xml file in PATH (files, "
+                        "LocalProfiles folders or whole Save folders) on the "
+                        "charts they have in common, with the plain, html or "
+                        "qt output")
+    parser.add_argument('--top', dest='top', type=int, default=3,
+                        metavar='K',
+                        help="how many scores --compare shows for each chart "
+                        "(defaults to 3)")
+    parser.add_argument('--rival', dest='rival', metavar='NAME',
+                        help="the profile whose rivals --compare shows "
+                        "(defaults to the first one)")
+    parser.add_argument('--diff', dest='diff', metavar='OLD',
+                        help="list the charts whose scores improved, got "
+                        "worse, changed grade or were played for the first "
+                        "time since OLD, an older copy of the Stats.xml "
+                        "file (with the plain, csv or jsonl output)")
+    parser.add_argument('-p', '--player', dest='player', metavar='NAME',
+                        help="only show the best scores of the player NAME "
+                        "(for machine profiles, which keep the scores of "
+                        "everyone who played on the machine)")
+    parser.add_argument('--timings', dest='timings', nargs='?', const='-',
+                        metavar='FILE',
+                        help="print how long each phase of the run took and "
+                        "how much memory it used, or save them to FILE as JSON")
+    parser.add_argument('--profile', dest='profile', metavar='FILE',
+                        help="save a cProfile dump of the run to FILE, which "
+                        "can be read with Python's pstats module")
     return parser
 
+def open_history(database, stats):
+    """Returns a history.HistoryStats for the profile of a Stats.xml file, or
+    for the only profile in the database if there's no file."""
+    connection = history.connect(database)
+    if stats is not None:
+        guid = history.get_profile_guid(stats.header)
+    else:
+        profiles = history.get_profiles(connection)
+        if len(profiles) != 1:
+            sys.exit("Error: Please specify a Stats.xml file for the profile "
+                     "to read from {}".format(database))
+        guid = profiles[0][0]
+
+    try:
+        return history.HistoryStats(connection, guid)
+    except ValueError as error:
+        sys.exit("Error: {}".format(error))
+
+
+def open_player(stats, name):
+    """Returns a highscores.PlayerStats with the best scores of a player of
+    a Stats.xml file."""
+    if stats is None:
+        sys.exit("Error: Could not find a Stats.xml file")
+
+    with timing.phase("index players"):
+        players = highscores.PlayerIndex(stats)
+    try:
+        return players.get_stats(name)
+    except ValueError as error:
+        sys.exit("Error: {} (players: {})".format(
+            error, ", ".join(players.get_names())))
+
+
+def run_batch(args, paths):
+    """Writes a report for every profile in paths, using the output, game
+    mode, grading system and destination from the command line."""
+    import smtracker.output.multi as multi
+    if args.output == "qt":
+        sys.exit("Error: Batch reports need an output other than 'qt' (-o)")
+    if args.jobs is not None and args.jobs < 1:
+        sys.exit("Error: --jobs should be at least 1")
+
+    dest = args.dest or BATCH_DEST
+    with timing.phase("batch"):
+        summaries = multi.save(paths, args.output, args.mode, DIFFICULTIES,
+                               args.theme, dest, jobs=args.jobs,
+                               systems_path=args.systems)
+
+    for summary in summaries:
+        if summary['error'] is not None:
+            print("Warning: {}: {}".format(summary['path'], summary['error']))
+    print("Wrote {} reports to {}".format(
+        sum(summary['error'] is None for summary in summaries), dest))
+
+
+def run_compare(args, paths):
+    """Compares every profile in paths, using the output, game mode,
+    grading system and destination from the command line."""
+    import smtracker.utils.rivals as rivals
+    if args.output not in ("plain", "html", "qt"):
+        sys.exit("Error: Profiles can only be compared with the plain, html "
+                 "or qt outputs (-o)")
+    if args.top < 1:
+        sys.exit("Error: --top should be at least 1")
+
+    with timing.phase("compare"):
+        board, skipped = rivals.read_leaderboard(paths, args.mode,
+                                                 DIFFICULTIES, args.theme,
+                                                 use_cache=args.cache)
+    for path, error in skipped:
+        print("Warning: {}: {}".format(path, error))
+    if not board.profiles:
+        sys.exit("Error: Could not find a Stats.xml file")
+    if args.rival is not None:
+        try:
+            board.find_profile(args.rival)
+        except ValueError as error:
+            sys.exit("Error: {} (profiles: {})".format(
+                error, ", ".join(board.profiles)))
+
+    if args.output == "plain":
+        import smtracker.output.plain as plain
+        with timing.phase("render"):
+            plain.leaderboard(board, args.top, args.rival)
+    elif args.output == "html":
+        import smtracker.output.html as html
+        html.save_leaderboard(board, args.top, args.rival,
+                              args.dest or HTML_DEST)
+    elif args.output == "qt":
+        import smtracker.output.qt as qt
+        qt.run_leaderboard(board, args.top, args.rival)
+
+
+def run_diff(args, stats):
+    """Compares a Stats.xml file with an older copy of it, using the output,
+    game mode, grading system and destination from the command line."""
+    import smtracker.utils.diff as diff
+    if args.output not in ("plain", "csv", "jsonl"):
+        sys.exit("Error: Diffs can only be shown with the plain, csv or jsonl "
+                 "outputs (-o)")
+    if stats is None:
+        sys.exit("Error: Could not find a Stats.xml file")
+    try:
+        old = parse.StatsFile(args.diff)
+    except (OSError, ValueError):
+        sys.exit("Error: {} is not a valid StepMania Stats.xml file".format(
+            args.diff))
+
+    with timing.phase("read old"):
+        score_diff = diff.ScoreDiff(old, stats, args.mode, DIFFICULTIES)
+    # Changes are written as the new file is read
+    with timing.phase("render"):
+        if args.output == "plain":
+            import smtracker.output.plain as plain
+            plain.diff_report(score_diff, args.theme)
+        elif args.output == "csv":
+            import smtracker.output.export as export
+            export.save_diff_csv(score_diff, args.dest)
+        elif args.output == "jsonl":
+            import smtracker.output.export as export
+            export.save_diff_jsonl(score_diff, args.dest)
+
+
 def main():
     """Runs smtracker."""
     parser = get_argparser()
     args = parser.parse_args()
+
+    if args.timings is not None:
+        timing.start()
+    if args.profile is not None:
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    # The Qt output only returns by exiting, so results are saved on the way out
+    try:
+        run(args)
+    finally:
+        if args.profile is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+        if args.timings is not None:
+            timings = timing.stop()
+            timings.counters['grade memo'] = systems.get_memo_stats()
+            save_timings(timings, args.timings)
+
+
+def save_timings(timings, dest):
+    """Prints a table of the timed phases to stderr, or saves them to dest
+    as JSON if dest isn't '-'."""
+    if dest == '-':
+        timings.report(sys.stderr)
+    else:
+        with open(dest, 'w') as timings_file:
+            timings.save(timings_file)
+
+
+def run(args):
+    """Runs smtracker with the parsed command line arguments."""
     statsxml = args.file
     gamemode = args.mode
     output_type = args.output
     theme = args.theme
     dest = args.dest
 
-    # Parse the statsxml file and return a tree for the outputs
-    if statsxml is not None:
-        stats = etree.parse(statsxml).getroot()
-
-        # Check if this is a valid Stats.xml file before doing anything
-        if stats.find("SongScores") is None:
-            sys.exit("Error: The specified file is not a valid StepMania Stats.xml file")
+    try:
+        systems.load_user_systems(args.systems)
+        systems.get_system(theme)
+    except ValueError as error:
+        sys.exit("Error: {}".format(error))
 
-    else:
-        stats = None
+    # A player's scores only exist in memory, so they can't be read by the
+    # modes which stream or store whole files
+    if args.player:
+        for option, value in (("--batch", args.batch),
+                              ("--compare", args.compare),
+                              ("--diff", args.diff),
+                              ("--ingest", args.ingest),
+                              ("--history", args.history)):
+            if value:
+                sys.exit("Error: --player can't be used with " + option)
 
     # Remove ignored difficulties from difficulties array
     if args.ignore:
@@ -102,10 +326,85 @@ def main():
             except ValueError:
                 print("Warning: {} is not a valid difficulty".format(args.ignore))
 
+    if args.batch:
+        paths = list(args.batch)
+        if statsxml is not None:
+            paths.insert(0, statsxml.name)
+        run_batch(args, paths)
+        return
+
+    if args.compare:
+        paths = list(args.compare)
+        if statsxml is not None:
+            paths.insert(0, statsxml.name)
+        run_compare(args, paths)
+        return
+
+    if statsxml is None:
+        with timing.phase("locate"):
+            statsxml = find_stats()
+
+    # Open the statsxml file for the outputs to stream from
+    if statsxml is not None:
+        # Check if this is a valid Stats.xml file before doing anything
+        try:
+            with timing.phase("read header"):
+                stats = parse.StatsFile(statsxml)
+        except (OSError, ValueError):
+            sys.exit("Error: The specified file is not a valid StepMania Stats.xml file")
+
+    else:
+        stats = None
+
+    if args.diff:
+        run_diff(args, stats)
+        return
+
+    if args.ingest:
+        if stats is None:
+            sys.exit("Error: Could not find a Stats.xml file")
+        added = history.ingest(history.connect(args.ingest), stats)
+        print("Added {} new scores to {}".format(added, args.ingest))
+        return
+
+    if args.history:
+        stats = open_history(args.history, stats)
+    elif args.player:
+        stats = open_player(stats, args.player)
+    elif stats is not None:
+        # Only the Qt interface keeps the whole profile in memory, so it
+        # reuses the scores parsed and graded on a previous run if the file
+        # hasn't changed. Every other output streams the file, so they work
+        # on files of any size.
+        if output_type == "qt":
+            if args.cache:
+                with timing.phase("load"):
+                    cache.load_stats(stats)
+            else:
+                with timing.phase("extract"):
+                    stats.load()
 
+    # Outputs are only imported once they are picked, so plain text reports
+    # don't have to load PyQt5 or Jinja2
     if output_type == "plain":
-        plain.report(stats, gamemode, DIFFICULTIES, theme)
+        import smtracker.output.plain as plain
+        # Scores are printed as they are read, so this is also the write phase
+        with timing.phase("render"):
+            plain.report(stats, gamemode, DIFFICULTIES, theme)
     elif output_type == "qt":
-        qt.run(stats, gamemode, DIFFICULTIES, theme)
+        import smtracker.output.qt as qt
+        qt.run(stats, gamemode, DIFFICULTIES, theme, args.cache)
     elif output_type == "html":
-        html.save(stats, gamemode, DIFFICULTIES, theme, dest)
+        import smtracker.output.html as html
+        html.save(stats, gamemode, DIFFICULTIES, theme, dest or HTML_DEST)
+    elif output_type == "html-virtual":
+        import smtracker.output.virtual as virtual
+        virtual.save(stats, gamemode, DIFFICULTIES, theme, dest or HTML_DEST)
+    elif output_type == "csv":
+        import smtracker.output.export as export
+        with timing.phase("render"):
+            export.save_csv(stats, gamemode, DIFFICULTIES, theme, dest)
+    elif output_type == "jsonl":
+        import smtracker.output.export as export
+        with timing.phase("render"):
+            export.save_jsonl(stats, gamemode, DIFFICULTIES, theme, dest)
@@ -0,0 +1,135 @@
+// Draws only the rows of the score table which are on screen.
+(function () {
+	"use strict";
+
+	var data = window.SMTRACKER_DATA;
+	var difficulties = Object.keys(data.scores);
+	var fields = ["grade", "percent", "W1", "W2", "W3", "W4", "W5", "Miss"];
+	var viewport = document.getElementById("viewport");
+	var tbody = document.getElementById("rows");
+	var filter = document.getElementById("filter");
+	var count = document.getElementById("count");
+
+	// Positions of every song, and of the songs which pass the filter, in
+	// the current sort order
+	var order = [];
+	for (var i = 0; i < data.title.length; i++) {
+		order.push(i);
+	}
+	var shown = order;
+	var rowHeight = 0;
+	var sortKey = null;
+	var sortDescending = false;
+
+	function escape(text) {
+		return String(text).replace(/&/g, "&amp;").replace(/</g, "&lt;")
+			.replace(/>/g, "&gt;").replace(/"/g, "&quot;");
+	}
+
+	function getColumn(key) {
+		if (key === "title") {
+			return data.title;
+		}
+		if (key === "group") {
+			return data.group.map(function (group) {
+				return data.groups[group];
+			});
+		}
+		var parts = key.split("/");
+		return data.scores[parts[0]][parts[1]];
+	}
+
+	function drawRow(song) {
+		var cells = ["<td>" + escape(data.groups[data.group[song]]) + "</td>",
+			"<td class=\"title\">" + escape(data.title[song]) + "</td>"];
+		difficulties.forEach(function (diff) {
+			var scores = data.scores[diff];
+			fields.forEach(function (field) {
+				var value = scores[field][song];
+				var text = value === null ? "" : value;
+				if (field === "percent" && value !== null) {
+					text = value.toFixed(2) + "%";
+				}
+				var classes = field === "grade" || field === "percent" ?
+					diff + " " + field : diff;
+				cells.push("<td class=\"" + escape(classes) + "\">" +
+					escape(text) + "</td>");
+			});
+		});
+		return "<tr>" + cells.join("") + "</tr>";
+	}
+
+	function spacer(height) {
+		return "<tr style=\"height: " + height + "px\"></tr>";
+	}
+
+	function draw() {
+		if (rowHeight === 0 && shown.length > 0) {
+			tbody.innerHTML = drawRow(shown[0]);
+			rowHeight = tbody.firstChild.getBoundingClientRect().height || 22;
+		}
+		var height = rowHeight || 22;
+		var first = Math.max(0, Math.floor(viewport.scrollTop / height) - 5);
+		var last = Math.min(shown.length,
+			first + Math.ceil(viewport.clientHeight / height) + 10);
+
+		var rows = [spacer(first * height)];
+		for (var row = first; row < last; row++) {
+			rows.push(drawRow(shown[row]));
+		}
+		rows.push(spacer((shown.length - last) * height));
+		tbody.innerHTML = rows.join("");
+		count.textContent = shown.length + " of " + order.length + " songs";
+	}
+
+	function compare(a, b) {
+		// Songs without a score come first
+		if (a === b) {
+			return 0;
+		}
+		if (a === null) {
+			return -1;
+		}
+		if (b === null) {
+			return 1;
+		}
+		if (typeof a === "string") {
+			return a.localeCompare(b);
+		}
+		return a - b;
+	}
+
+	function sortBy(key) {
+		sortDescending = key === sortKey ? !sortDescending : false;
+		sortKey = key;
+		var column = getColumn(key);
+		order.sort(function (a, b) {
+			var result = compare(column[a], column[b]) || a - b;
+			return sortDescending ? -result : result;
+		});
+		applyFilter();
+	}
+
+	function applyFilter() {
+		var text = filter.value.toLowerCase();
+		if (text === "") {
+			shown = order;
+		} else {
+			shown = order.filter(function (song) {
+				return data.title[song].toLowerCase().indexOf(text) !== -1;
+			});
+		}
+		draw();
+	}
+
+	Array.prototype.forEach.call(document.querySelectorAll("th[data-key]"),
+		function (header) {
+			header.addEventListener("click", function () {
+				sortBy(header.getAttribute("data-key"));
+			});
+		});
+	filter.addEventListener("input", applyFilter);
+	viewport.addEventListener("scroll", draw);
+	window.addEventListener("resize", draw);
+	draw();
+}());
@@ -0,0 +1,79 @@
+#!/usr/bin/python3
+# Copyright (C) 2016 Renan Guilherme Lebre Ramos
+# This file is a part of smtracker.
+#
+# smtracker is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Functions for grading many scores with every grading system at once."""
+
+from array import array
+from operator import attrgetter, itemgetter
+
+import smtracker.utils.parse as parse
+import smtracker.utils.systems as systems
+
+# Columns used by grade_columns, named after ScoreRecord attributes
+COLUMNS = parse.TIMINGS + ('grade', 'difficulty')
+
+
+def to_columns(records):
+    """Returns a dict with a column for each of COLUMNS, taken from a list of
+    parse.ScoreRecords. Judgment counts are stored as integer arrays.
+
+    Arguments:
+    records -- the parse.ScoreRecords to read; all of them should have a score
+    """
+    columns = {}
+    for timing in parse.TIMINGS:
+        columns[timing] = array('l', map(attrgetter(timing), records))
+    columns['grade'] = list(map(attrgetter('grade'), records))
+    columns['difficulty'] = list(map(attrgetter('difficulty'), records))
+    return columns
+
+
+def grade_columns(columns):
+    """Grades every score in a set of columns with all grading systems.
+
+    Arguments:
+    columns -- a dict with an equally long sequence for each of COLUMNS
+
+    Returns a dict with three dicts of lists, each in the same order as the
+    columns: 'tiers' and 'grades' (keyed by grading system) and 'scores' (keyed
+    by the grading systems which have a score, like 'supernova2', 'ddra' and
+    'iidx').
+    """
+    counts = list(zip(*(columns[timing] for timing in parse.TIMINGS)))
+    failed = [grade == "Failed" for grade in columns['grade']]
+
+    # Each system grades the whole set of scores at once, instead of looking
+    # up every system again for each score. Scores with the same judgments
+    # are only graded once, thanks to the systems' memo.
+    tiers = {}
+    grades = {}
+    scores = {}
+    for name, system in systems.SYSTEMS.items():
+        results = systems.evaluate_many(system, counts, failed,
+                                        columns['difficulty'])
+        tiers[name] = list(map(itemgetter(0), results))
+        grades[name] = list(map(itemgetter(1), results))
+        if system.score_function is not None:
+            scores[name] = list(map(itemgetter(2), results))
+
+    return {'tiers': tiers, 'grades': grades, 'scores': scores}
+
+
+def grade_records(records):
+    """Grades a list of parse.ScoreRecords with all grading systems. See
+    grade_columns for what is returned."""
+    return grade_columns(to_columns(records))
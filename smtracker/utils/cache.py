@@ -0,0 +1,160 @@
+#!/usr/bin/python3
+# Copyright (C) 2016 Renan Guilherme Lebre Ramos
+# This file is a part of smtracker.
+#
+# smtracker is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Functions for caching parsed and graded Stats.xml files on disk."""
+
+import sys
+import os
+import hashlib
+import pickle
+
+import smtracker
+import smtracker.utils.batch as batch
+import smtracker.utils.systems as systems
+import smtracker.utils.timing as timing
+
+# Bump this whenever ScoreRecord, the grading functions or the way songs are
+# read change, so entries written by older versions are thrown out. Entries
+# are also thrown out when the grading systems (including user-defined ones)
+# change.
+CACHE_VERSION = 4
+
+
+def get_cache_location():
+    """Returns the directory where smtracker keeps its cache."""
+    if sys.platform.startswith('win32') or sys.platform.startswith('cygwin'):
+        base = os.environ.get('LOCALAPPDATA', os.environ.get('APPDATA', ''))
+        return os.path.join(base, "smtracker", "cache")
+
+    base = os.environ.get('XDG_CACHE_HOME')
+    if not base:
+        base = os.path.join(os.environ['HOME'], ".cache")
+    return os.path.join(base, "smtracker")
+
+
+def get_fingerprint(path):
+    """Returns a (path, mtime, size, content hash) tuple for a file."""
+    path = os.path.abspath(path)
+    info = os.stat(path)
+    digest = hashlib.blake2b()
+    with open(path, 'rb') as statsxml:
+        for chunk in iter(lambda: statsxml.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return (path, info.st_mtime_ns, info.st_size, digest.hexdigest())
+
+
+def get_entry_path(path):
+    """Returns where the cache entry for a Stats.xml file is kept."""
+    name = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+    return os.path.join(get_cache_location(), name + ".pickle")
+
+
+def read_entry(fingerprint):
+    """Returns the cached (songs, grades) of a Stats.xml file, or None if
+    there's no cache entry for it, or if the entry is stale or unreadable.
+    Bad entries are deleted.
+
+    Arguments:
+    fingerprint -- the get_fingerprint() of the file, as it is right now
+    """
+    path = fingerprint[0]
+    try:
+        with open(get_entry_path(path), 'rb') as entry_file:
+            entry = pickle.load(entry_file)
+        if (entry['version'] == CACHE_VERSION and
+                entry['smtracker'] == smtracker.__version__ and
+                entry['systems'] == systems.get_signature() and
+                entry['fingerprint'] == fingerprint):
+            return (entry['songs'], entry['grades'])
+    except FileNotFoundError:
+        return None
+    except Exception:
+        # Anything could go wrong while unpickling a broken file
+        pass
+
+    remove_entry(path)
+    return None
+
+
+def write_entry(fingerprint, songs, grades):
+    """Saves the songs and grades of a Stats.xml file to the cache.
+
+    Arguments:
+    fingerprint -- the get_fingerprint() of the file, taken before parsing it
+    songs       -- the songs of the file, as in parse.StatsFile.songs
+    grades      -- the batch.grade_records() of the file's scored records
+    """
+    entry = {'version': CACHE_VERSION,
+             'smtracker': smtracker.__version__,
+             'systems': systems.get_signature(),
+             'fingerprint': fingerprint,
+             'songs': songs,
+             'grades': grades}
+
+    entry_path = get_entry_path(fingerprint[0])
+    temp_path = entry_path + ".tmp"
+    try:
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        with open(temp_path, 'wb') as entry_file:
+            pickle.dump(entry, entry_file, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, entry_path)
+    except OSError:
+        # Not being able to cache a file shouldn't stop smtracker from working
+        pass
+
+
+def remove_entry(path):
+    """Deletes the cache entry for a Stats.xml file, if there's one."""
+    try:
+        os.remove(get_entry_path(path))
+    except OSError:
+        pass
+
+
+def load_stats(stats):
+    """Loads the songs and grades of a parse.StatsFile, from the cache if it
+    has an up-to-date entry for the file, or else by parsing and grading the
+    file and saving the results to the cache.
+
+    Arguments:
+    stats -- the parse.StatsFile to load
+
+    Files which don't exist on disk (like stdin) are simply loaded.
+    """
+    path = stats.name
+    if not isinstance(path, str) or not os.path.isfile(path):
+        with timing.phase("extract"):
+            stats.load()
+        with timing.phase("grade"):
+            stats.grades = batch.grade_records(stats.scored_records())
+        return stats
+
+    # The fingerprint is taken before parsing, so changes made to the file
+    # while it's being parsed will make the entry stale
+    with timing.phase("read cache"):
+        fingerprint = get_fingerprint(path)
+        entry = read_entry(fingerprint)
+    if entry is not None:
+        stats.songs, stats.grades = entry
+    else:
+        with timing.phase("extract"):
+            stats.load()
+        with timing.phase("grade"):
+            stats.grades = batch.grade_records(stats.scored_records())
+        with timing.phase("write cache"):
+            write_entry(fingerprint, stats.songs, stats.grades)
+    return stats
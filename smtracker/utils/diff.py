@@ -0,0 +1,134 @@
+#!/usr/bin/python3
+# Copyright (C) 2016 Renan Guilherme Lebre Ramos
+# This file is a part of smtracker.
+#
+# smtracker is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Functions for comparing two copies of the same Stats.xml file.
+
+Both files are streamed. The older one is read first, keeping only the
+PercentDP and grades of each chart with a score in a dict keyed by
+(song_dir, Difficulty). The newer one is then matched against it one chart
+at a time, so the whole comparison takes a single pass over each file.
+"""
+
+from collections import namedtuple
+
+import smtracker.utils.parse as parse
+import smtracker.utils.systems as systems
+
+# What happened to a chart between the two files
+IMPROVED = 'improved'   # Its PercentDP went up
+WORSE = 'worse'         # Its PercentDP went down
+NEW = 'new'             # It only has a score in the new file
+CHANGED = 'changed'     # Same PercentDP, but a different grade
+MISSING = 'missing'     # It only has a score in the old file
+
+KINDS = (IMPROVED, WORSE, NEW, CHANGED, MISSING)
+
+# The score of a chart in one of the files, with its grade in every grading
+# system (in the order of ScoreDiff.themes)
+Snapshot = namedtuple('Snapshot', ['percent_dp', 'grades'])
+
+# A chart whose score changed, where old or new is None if the chart had no
+# score in that file
+Change = namedtuple('Change', ['kind', 'song_dir', 'difficulty', 'old',
+                               'new'])
+
+
+class ScoreDiff:
+    """The charts whose scores changed between two Stats.xml files."""
+
+    def __init__(self, old, new, mode, difficulties):
+        """Reads the scores of the old file.
+
+        Arguments:
+        old          -- a parse.StatsFile for the older file
+        new          -- a parse.StatsFile for the newer file
+        mode         -- the game mode to compare scores from
+        difficulties -- the difficulties which should be compared
+        """
+        self.old = old
+        self.new = new
+        self.mode = mode
+        self.difficulties = difficulties
+        self.themes = systems.get_names()
+        self.grade_functions = [systems.get_system(theme).grade
+                                for theme in self.themes]
+        # How many charts of each kind were found, once iterated over
+        self.counts = dict.fromkeys(KINDS, 0)
+
+        self.snapshots = {}
+        for song_dir, records in old:
+            for difficulty, record in self.iter_scores(records):
+                self.snapshots[(song_dir, difficulty)] = self.snapshot(record)
+
+    def iter_scores(self, records):
+        """Yields a (difficulty, record) tuple for each record of a song with
+        a score, in the order of self.difficulties."""
+        charts = parse.index_records(records)
+        for difficulty in self.difficulties:
+            record = charts.get((self.mode, difficulty))
+            if record is not None and record.has_score():
+                yield (difficulty, record)
+
+    def snapshot(self, record):
+        """Returns the Snapshot of a parse.ScoreRecord."""
+        return Snapshot(record.percent_dp,
+                        tuple(grade(record) for grade in self.grade_functions))
+
+    def __iter__(self):
+        """Yields a Change for every chart whose score changed, as the new
+        file is read, followed by the charts missing from the new file.
+
+        Can only be iterated over once.
+        """
+        snapshots = self.snapshots
+        for song_dir, records in self.new:
+            for difficulty, record in self.iter_scores(records):
+                new = self.snapshot(record)
+                old = snapshots.pop((song_dir, difficulty), None)
+                if old is None:
+                    kind = NEW
+                elif new.percent_dp > old.percent_dp:
+                    kind = IMPROVED
+                elif new.percent_dp < old.percent_dp:
+                    kind = WORSE
+                elif new.grades != old.grades:
+                    kind = CHANGED
+                else:
+                    continue
+                self.counts[kind] += 1
+                yield Change(kind, song_dir, difficulty, old, new)
+
+        # Whatever wasn't matched has no score in the new file
+        for (song_dir, difficulty), old in snapshots.items():
+            self.counts[MISSING] += 1
+            yield Change(MISSING, song_dir, difficulty, old, None)
+        snapshots.clear()
+
+    def get_grades(self, change, theme):
+        """Returns the (old, new) grades of a Change in a grading system,
+        where a grade is None if the chart had no score in that file."""
+        position = self.themes.index(theme)
+        return tuple(None if snapshot is None else snapshot.grades[position]
+                     for snapshot in (change.old, change.new))
+
+
+def get_percent_delta(change):
+    """Returns how much the PercentDP of a Change went up (or down), or None
+    if one of the files has no score for the chart."""
+    if change.old is None or change.new is None:
+        return None
+    return change.new.percent_dp - change.old.percent_dp
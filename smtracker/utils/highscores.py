@@ -0,0 +1,365 @@
+#!/usr/bin/python3
+# Copyright (C) 2016 Renan Guilherme Lebre Ramos
+# This file is a part of smtracker.
+#
+# smtracker is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Functions for keeping every HighScore of a Stats.xml file in memory.
+
+A parse.StatsFile only keeps the first HighScore of each chart, but the
+HighScoreList of a machine profile holds the scores of many players. A
+HighScoreTable keeps all of them as columns: an array for each field, with
+player names, modifiers and grades stored once and referred to by their
+position. No object is kept around for each HighScore.
+"""
+
+import copy
+import sys
+import xml.etree.ElementTree as etree
+from array import array
+from itertools import compress, repeat
+from operator import eq, sub
+
+import smtracker.utils.parse as parse
+
+# Turns a DateTime ("2016-06-09 12:34:56") into the digits of a number
+# (20160609123456), which sorts just like the DateTime does
+_DATE_DIGITS = str.maketrans('', '', '-: ')
+
+
+def date_time_to_number(date_time):
+    """Converts a HighScore's DateTime into a number, or 0 if it's missing."""
+    if not date_time:
+        return 0
+    return int(date_time.translate(_DATE_DIGITS))
+
+
+def number_to_date_time(number):
+    """Converts a number from date_time_to_number back into a DateTime, or
+    None if it was missing."""
+    if number == 0:
+        return None
+    digits = "{:014}".format(number)
+    return "{}-{}-{} {}:{}:{}".format(digits[0:4], digits[4:6], digits[6:8],
+                                      digits[8:10], digits[10:12],
+                                      digits[12:14])
+
+
+class StringPool:
+    """A list of strings where each string is only stored once."""
+
+    def __init__(self):
+        """Creates an empty pool."""
+        self.strings = []
+        self.positions = {}
+
+    def add(self, string):
+        """Returns the position of a string in the pool, adding it first if
+        it isn't there yet."""
+        position = self.positions.get(string)
+        if position is None:
+            position = len(self.strings)
+            string = sys.intern(string)
+            self.strings.append(string)
+            self.positions[string] = position
+        return position
+
+    def find(self, string):
+        """Returns the position of a string in the pool, or None if it isn't
+        there."""
+        return self.positions.get(string)
+
+    def __getitem__(self, position):
+        return self.strings[position]
+
+    def __len__(self):
+        return len(self.strings)
+
+
+class HighScoreTable:
+    """Every HighScore of a Stats.xml file, as columns.
+
+    HighScores are numbered in the order they are found in the file, so the
+    HighScores of a chart are always next to each other, starting at
+    chart_offsets[chart]. Charts (starting at song_offsets[song]) and songs
+    are numbered in the same way.
+    """
+
+    def __init__(self):
+        """Creates an empty table."""
+        # The song_dir of each song, and where its charts start (the last
+        # offset is where the charts end)
+        self.songs = []
+        self.song_offsets = array('l', [0])
+        # The (song_dir, steps_type, difficulty) of each chart, and where its
+        # HighScores start (the last offset is where the table ends)
+        self.charts = []
+        self.chart_offsets = array('l', [0])
+        # The first chart for each (song_dir, steps_type, difficulty)
+        self.chart_positions = {}
+
+        self.names = StringPool()
+        self.modifiers = StringPool()
+        self.grades = StringPool()
+
+        # A column for each field of the HighScores
+        self.chart = array('l')
+        self.name = array('l')
+        self.modifier = array('l')
+        self.grade = array('l')
+        self.percent_dp = array('d')
+        self.date_time = array('q')
+        self.counts = {timing: array('l') for timing in parse.TIMINGS}
+
+    def __len__(self):
+        """Returns how many HighScores the table has."""
+        return len(self.chart)
+
+    def add_song(self, song_dir, song):
+        """Adds every HighScore of a Song ElementTree to the table."""
+        counts = [self.counts[timing].append for timing in parse.TIMINGS]
+        positions = {timing: position
+                     for position, timing in enumerate(parse.TIMINGS)}
+
+        for steps in song:
+            chart_key = (sys.intern(song_dir),
+                         sys.intern(steps.attrib['StepsType']),
+                         sys.intern(steps.attrib['Difficulty']))
+            chart = len(self.charts)
+            self.charts.append(chart_key)
+            self.chart_positions.setdefault(chart_key, chart)
+
+            for highscore in steps.iterfind("HighScoreList/HighScore"):
+                values = [0] * len(parse.TIMINGS)
+                name = modifiers = grade = ""
+                percent_dp = 0.0
+                date_time = 0
+                for child in highscore:
+                    tag = child.tag
+                    if tag == "TapNoteScores" or tag == "HoldNoteScores":
+                        for note in child:
+                            position = positions.get(note.tag)
+                            if position is not None:
+                                values[position] = int(note.text)
+                    elif tag == "Grade":
+                        grade = child.text or ""
+                    elif tag == "PercentDP":
+                        percent_dp = float(child.text)
+                    elif tag == "DateTime":
+                        date_time = date_time_to_number(child.text)
+                    elif tag == "Modifiers":
+                        modifiers = child.text or ""
+                    elif tag == "Name":
+                        name = child.text or ""
+
+                self.chart.append(chart)
+                self.name.append(self.names.add(name))
+                self.modifier.append(self.modifiers.add(modifiers))
+                self.grade.append(self.grades.add(grade))
+                self.percent_dp.append(percent_dp)
+                self.date_time.append(date_time)
+                for append, value in zip(counts, values):
+                    append(value)
+
+            self.chart_offsets.append(len(self.chart))
+
+        self.songs.append(sys.intern(song_dir))
+        self.song_offsets.append(len(self.charts))
+
+    def find_chart(self, song_dir, steps_type, difficulty):
+        """Returns the number of a chart, or None if it isn't in the table."""
+        return self.chart_positions.get((song_dir, steps_type, difficulty))
+
+    def attempts(self, chart=None, name=None):
+        """Returns the HighScores of a chart, of a player, or of a player on
+        a chart (every HighScore if neither is given), in file order.
+
+        Arguments:
+        chart -- the number of a chart, as in find_chart()
+        name  -- the name of a player
+        """
+        if chart is None:
+            scores = range(len(self))
+        else:
+            scores = range(self.chart_offsets[chart],
+                           self.chart_offsets[chart + 1])
+        if name is None:
+            return scores
+
+        name = self.names.find(name)
+        if name is None:
+            return []
+        names = self.name[scores.start:scores.stop]
+        return list(compress(scores, map(eq, names, repeat(name))))
+
+    def count_by_chart(self):
+        """Returns an array with how many HighScores each chart has."""
+        offsets = self.chart_offsets
+        return array('l', map(sub, offsets[1:], offsets[:-1]))
+
+    def best_by_player(self):
+        """Returns a dict with a dict for each player name, which has the
+        HighScore with the highest PercentDP of each chart the player has a
+        HighScore on (the first one found, if there's a tie)."""
+        bests = {}
+        percent_dp = self.percent_dp
+        for score, (name, chart) in enumerate(zip(self.name, self.chart)):
+            charts = bests.get(name)
+            if charts is None:
+                charts = bests[name] = {}
+            best = charts.get(chart)
+            if best is None or percent_dp[score] > percent_dp[best]:
+                charts[chart] = score
+
+        return {self.names[name]: charts for name, charts in bests.items()}
+
+    def get_record(self, score):
+        """Returns a parse.ScoreRecord for a HighScore, which can be graded
+        and shown by the outputs like any other."""
+        song_dir, steps_type, difficulty = self.charts[self.chart[score]]
+        record = parse.ScoreRecord(song_dir, steps_type, difficulty)
+        record.name = self.names[self.name[score]]
+        record.modifiers = self.modifiers[self.modifier[score]]
+        record.grade = self.grades[self.grade[score]] or None
+        record.percent_dp = self.percent_dp[score]
+        record.date_time = number_to_date_time(self.date_time[score])
+        for timing in parse.TIMINGS:
+            setattr(record, timing, self.counts[timing][score])
+        return record
+
+
+def read_table(stats):
+    """Returns a HighScoreTable with every HighScore of a parse.StatsFile,
+    which is always streamed."""
+    table = HighScoreTable()
+    for song_dir, song in stats.iter_elements():
+        table.add_song(song_dir, song)
+    return table
+
+
+class PlayerStats:
+    """The best scores of a single player of a machine profile, which the
+    outputs can read just like a parse.StatsFile (it has the same header,
+    songs and grades, and is iterated over the same way).
+
+    Only the songs and charts the player has a score on are included. It
+    isn't a file, so it can't be streamed, cached or read again from disk.
+    """
+
+    def __init__(self, players, name):
+        """Gathers a player's best scores from a PlayerIndex.
+
+        Arguments:
+        players -- the PlayerIndex of the machine profile
+        name    -- the name of the player
+
+        Will raise a ValueError if the player has no scores.
+        """
+        if name not in players.bests:
+            raise ValueError("{} has no scores in this profile".format(name))
+
+        self.players = players
+        self.player = name
+        self.grades = None  # batch.grade_records() of scored_records(), if set
+        # A player's scores aren't a file smtracker can cache
+        self.name = None
+
+        # The header says whose scores these are, so the outputs show the
+        # player's name instead of "(machine profile)"
+        general = copy.deepcopy(players.stats.header.find("GeneralData"))
+        for tag, text in (("IsMachine", "0"), ("DisplayName", name)):
+            field = general.find(tag)
+            if field is None:
+                field = etree.SubElement(general, tag)
+            field.text = text
+        self.header = etree.Element(players.stats.header.tag)
+        self.header.append(general)
+
+        table = players.table
+        bests = players.bests[name]
+        self.songs = []
+        for song, song_dir in enumerate(table.songs):
+            records = [table.get_record(bests[chart]) for chart
+                       in range(table.song_offsets[song],
+                                table.song_offsets[song + 1])
+                       if chart in bests]
+            if records:
+                self.songs.append((song_dir, records))
+
+    def load(self):
+        """A player's scores are always in memory."""
+        return self
+
+    def scored_records(self):
+        """Returns a list with every ScoreRecord that has a score, in the same
+        order they are found in the file."""
+        return [record for _, records in self.songs for record in records
+                if record.has_score()]
+
+    def __iter__(self):
+        """Yields a (song_dir, records) tuple for each song, where records has
+        the player's best score on each of the song's charts."""
+        return iter(self.songs)
+
+    def iter_highscores(self):
+        """Yields a (song_dir, records) tuple for each song, where records has
+        every score of the player on the song's charts."""
+        table = self.players.table
+        for song, song_dir in enumerate(table.songs):
+            records = [table.get_record(score) for chart
+                       in range(table.song_offsets[song],
+                                table.song_offsets[song + 1])
+                       for score in table.attempts(chart, self.player)]
+            if records:
+                yield (song_dir, records)
+
+
+class PlayerIndex:
+    """The best score of every player on every chart of a machine profile,
+    read in a single pass over the file.
+
+    Each player's PlayerStats is only built once, so switching between
+    players doesn't read anything again.
+    """
+
+    def __init__(self, stats):
+        """Reads every HighScore of a profile.
+
+        Arguments:
+        stats -- the parse.StatsFile of the profile
+        """
+        self.stats = stats
+        self.table = read_table(stats)
+        # A dict for each player name, with the best HighScore of each chart
+        self.bests = self.table.best_by_player()
+        self.views = {}
+
+    def get_names(self):
+        """Returns the names of every player with a score, sorted."""
+        return sorted(name for name in self.bests if name)
+
+    def get_stats(self, name):
+        """Returns the PlayerStats of a player.
+
+        Will raise a ValueError if the player has no scores.
+        """
+        if name not in self.views:
+            self.views[name] = PlayerStats(self, name)
+        return self.views[name]
+
+
+def is_machine_profile(stats):
+    """Returns whether a parse.StatsFile is a machine profile, which may have
+    scores of many players."""
+    return stats.header.find("GeneralData").findtext("IsMachine") == "1"
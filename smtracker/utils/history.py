@@ -0,0 +1,247 @@
+#!/usr/bin/python3
+# Copyright (C) 2016 Renan Guilherme Lebre Ramos
+# This file is a part of smtracker.
+#
+# smtracker is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Functions for keeping every score ever seen in an SQLite database.
+
+A Stats.xml file only keeps the best scores of each chart, so ingesting it
+every now and then is the only way of keeping track of progress over time.
+"""
+
+import sqlite3
+import xml.etree.ElementTree as etree
+
+import smtracker.utils.parse as parse
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    guid TEXT PRIMARY KEY,
+    general_data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS scores (
+    profile TEXT NOT NULL,
+    song_dir TEXT NOT NULL,
+    steps_type TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    date_time TEXT NOT NULL,
+    name TEXT NOT NULL,
+    steps_index INTEGER NOT NULL,
+    grade TEXT,
+    percent_dp REAL NOT NULL,
+    W1 INTEGER NOT NULL,
+    W2 INTEGER NOT NULL,
+    W3 INTEGER NOT NULL,
+    W4 INTEGER NOT NULL,
+    W5 INTEGER NOT NULL,
+    Miss INTEGER NOT NULL,
+    HitMine INTEGER NOT NULL,
+    Held INTEGER NOT NULL,
+    LetGo INTEGER NOT NULL,
+    modifiers TEXT NOT NULL,
+    PRIMARY KEY (profile, song_dir, steps_type, difficulty, date_time, name)
+);
+
+CREATE INDEX IF NOT EXISTS scores_by_chart
+    ON scores (song_dir, steps_type, difficulty);
+
+CREATE INDEX IF NOT EXISTS scores_by_date
+    ON scores (date_time);
+"""
+
+# Columns of the scores table which are taken straight from a ScoreRecord
+RECORD_COLUMNS = (('song_dir', 'steps_type', 'difficulty', 'date_time', 'name',
+                   'grade', 'percent_dp') + parse.TIMINGS + ('modifiers',))
+
+
+def connect(database):
+    """Opens (and creates, if needed) a history database."""
+    connection = sqlite3.connect(database)
+    connection.executescript(SCHEMA)
+    _migrate(connection)
+    return connection
+
+
+def _migrate(connection):
+    """Updates a database created before scores could be stored without a
+    grade, whose grade column can't be NULL (so scores without a grade would
+    be dropped on ingest), and whose missing grades are empty strings."""
+    columns = {row[1]: row[3]
+               for row in connection.execute("PRAGMA table_info(scores)")}
+    if not columns.get('grade'):
+        return
+
+    # SQLite can't change a column's constraints, so the table is created
+    # again and the scores are copied over
+    connection.execute("BEGIN")
+    try:
+        connection.execute("ALTER TABLE scores RENAME TO old_scores")
+        # The indexes still belong to old_scores here, so this only creates
+        # the table
+        for statement in SCHEMA.split(";"):
+            connection.execute(statement)
+        connection.execute("INSERT INTO scores SELECT * FROM old_scores")
+        connection.execute("UPDATE scores SET grade = NULL WHERE grade = ''")
+        connection.execute("DROP TABLE old_scores")
+    except sqlite3.Error:
+        connection.rollback()
+        raise
+    connection.commit()
+    connection.executescript(SCHEMA)
+
+
+def get_profile_guid(header):
+    """Returns the Guid of a profile from a Stats tree, falling back to its
+    display name for files which don't have one."""
+    general = header.find("GeneralData")
+    guid = general.findtext("Guid")
+    if not guid:
+        guid = parse.get_profile_name(header)
+    return guid
+
+
+# Columns which are part of the primary key, where missing HighScore fields
+# are stored as empty strings (SQLite never finds two NULLs to be the same,
+# so scores without them would be added again on every ingest). Other missing
+# fields, like the grade of a Steps without a score, are stored as NULL.
+KEY_COLUMNS = ('date_time', 'name')
+
+
+def _get_value(record, column):
+    """Returns the value to store for a column of a ScoreRecord."""
+    value = getattr(record, column)
+    if value is None and column in KEY_COLUMNS:
+        return ""
+    return value
+
+
+def ingest(connection, stats):
+    """Adds every HighScore of a Stats.xml file to a history database.
+
+    Arguments:
+    connection -- a connection from connect()
+    stats      -- the parse.StatsFile to ingest; it is always streamed
+
+    Scores already in the database (same profile, chart, DateTime and player
+    name) are skipped. Returns how many scores were added.
+    """
+    guid = get_profile_guid(stats.header)
+    general_data = etree.tostring(stats.header.find("GeneralData"),
+                                  encoding='unicode')
+
+    insert = "INSERT OR IGNORE INTO scores (profile, steps_index, {}) " \
+             "VALUES (?, ?, {})".format(", ".join(RECORD_COLUMNS),
+                                        ", ".join("?" * len(RECORD_COLUMNS)))
+
+    with connection:
+        before = connection.total_changes
+        connection.execute("INSERT OR REPLACE INTO profiles VALUES (?, ?)",
+                           (guid, general_data))
+
+        for _, records in stats.iter_highscores():
+            # Keep the position of each Steps in its Song, so songs can be
+            # read back in the same order as in the file
+            positions = {}
+            rows = []
+            for record in records:
+                chart = (record.steps_type, record.difficulty)
+                position = positions.setdefault(chart, len(positions))
+                rows.append((guid, position) + tuple(
+                    _get_value(record, column) for column in RECORD_COLUMNS))
+            connection.executemany(insert, rows)
+
+        # The profile row is always replaced, and counts as a change
+        added = connection.total_changes - before - 1
+    return added
+
+
+class HistoryStats(parse.StatsFile):
+    """The best score of each chart of a profile in a history database, which
+    the outputs can read just like a parse.StatsFile."""
+
+    def __init__(self, connection, guid):
+        """Reads the header of a profile from a history database.
+
+        Arguments:
+        connection -- a connection from connect()
+        guid       -- the profile to read, as in get_profile_guid()
+
+        Will raise a ValueError if the profile isn't in the database.
+        """
+        # pylint: disable=super-init-not-called
+        row = connection.execute("SELECT general_data FROM profiles "
+                                 "WHERE guid = ?", (guid,)).fetchone()
+        if row is None:
+            raise ValueError("{} is not in the history database".format(guid))
+
+        self.source = connection
+        self.guid = guid
+        self.header = etree.Element("Stats")
+        self.header.append(etree.fromstring(row[0]))
+        self.songs = None
+        self.grades = None
+
+    @property
+    def name(self):
+        """History databases aren't files smtracker can cache."""
+        return None
+
+    def iter_highscores(self):
+        """Yields a (song_dir, records) tuple for each song, where records has
+        every score ever ingested for the song's charts."""
+        return self._stream(all_highscores=True)
+
+    def _stream(self, all_highscores=False):
+        """Yields the songs of the profile, ordered by their directory."""
+        # SQLite returns the other columns of the row holding the MAX()
+        if all_highscores:
+            query = ("SELECT {} FROM scores WHERE profile = ? "
+                     "ORDER BY song_dir, steps_index, date_time")
+        else:
+            query = ("SELECT {}, MAX(percent_dp) FROM scores WHERE profile = ? "
+                     "GROUP BY song_dir, steps_type, difficulty "
+                     "ORDER BY song_dir, steps_index")
+        cursor = self.source.execute(query.format(", ".join(RECORD_COLUMNS)),
+                                     (self.guid,))
+
+        song_dir = None
+        records = []
+        for row in cursor:
+            if row[0] != song_dir:
+                if song_dir is not None:
+                    yield (song_dir, records)
+                song_dir = row[0]
+                records = []
+
+            record = parse.ScoreRecord(row[0], row[1], row[2])
+            for column, value in zip(RECORD_COLUMNS[3:], row[3:]):
+                setattr(record, column, value)
+            records.append(record)
+
+        if song_dir is not None:
+            yield (song_dir, records)
+
+
+def get_profiles(connection):
+    """Returns a list of (guid, display name) tuples for every profile in a
+    history database."""
+    profiles = []
+    for guid, general_data in connection.execute("SELECT guid, general_data "
+                                                 "FROM profiles ORDER BY guid"):
+        header = etree.Element("Stats")
+        header.append(etree.fromstring(general_data))
+        profiles.append((guid, parse.get_profile_name(header)))
+    return profiles
@@ -20,6 +20,10 @@
 import sys
 import os
 import datetime
+import xml.etree.ElementTree as etree
+
+# How much of a Stats.xml file is read at a time when looking for its header
+HEADER_CHUNK_SIZE = 4096
 
 def get_profile_location():
     """Returns the directories containing the local and machine profiles."""
@@ -51,6 +55,31 @@ def get_profile_location():
     return (local_profile, machine_profile)
 
 
+def find_profiles(paths):
+    """Returns every Stats.xml file found in a list of paths, in order and
+    without repeating any. Files are taken as they are, and folders (like
+    LocalProfiles or a whole Save folder) are searched for Stats.xml files.
+    """
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for folder, subfolders, files in os.walk(path):
+                subfolders.sort()
+                if "Stats.xml" in files:
+                    found.append(os.path.join(folder, "Stats.xml"))
+        else:
+            found.append(path)
+
+    profiles = []
+    seen = set()
+    for path in found:
+        key = os.path.realpath(path)
+        if key not in seen:
+            seen.add(key)
+            profiles.append(path)
+    return profiles
+
+
 def get_profile_name(stats):
     """Gets a profile name from the Stats tree."""
     is_machine = stats.find("GeneralData").find("IsMachine").text
@@ -72,44 +101,253 @@ def get_session_seconds(stats):
     return datetime.timedelta(seconds=int(stats.find("GeneralData").find("TotalGameplaySeconds").text))
 
 
-def highscore_stat(step, stat):
-    """Returns a stat from the first HighScore of a Steps ElementTree.
+def read_header(source):
+    """Reads a Stats.xml file only up to the end of its <GeneralData>.
 
     Arguments:
-    step -- the Steps ElementTree to search
-    stat -- the stat to return (e.g.: Name, Grade, Modifiers...)
+    source -- a path or a file object pointing to the Stats.xml file
 
-    Will raise an AttributeError if a song has no <HighScore>.
+    Returns a tree with the file's root element and <GeneralData> as its only
+    child, which the get_* functions above can be used on. Will raise a
+    ValueError if the file has no <GeneralData> before its <SongScores>, or
+    if it isn't an XML file at all.
     """
-    return step.find("HighScoreList").find("HighScore").find(stat).text
+    try:
+        if hasattr(source, 'read'):
+            source.seek(0)
+            return _read_header(source)
+        with open(source, 'rb') as statsxml:
+            return _read_header(statsxml)
+    except etree.ParseError:
+        raise ValueError("{} is not a valid StepMania Stats.xml file".format(
+            getattr(source, 'name', source)))
+
+
+def _read_header(statsxml):
+    """Feeds a Stats.xml file to a parser in small chunks, and stops as soon
+    as <GeneralData> is over."""
+    parser = etree.XMLPullParser(('start', 'end'))
+    root = None
+    for chunk in iter(lambda: statsxml.read(HEADER_CHUNK_SIZE), statsxml.read(0)):
+        parser.feed(chunk)
+        for event, element in parser.read_events():
+            if root is None:
+                root = element
+            elif event == 'end' and element.tag == "GeneralData":
+                header = etree.Element(root.tag)
+                header.append(element)
+                return header
+            elif event == 'start' and element.tag == "SongScores":
+                break
+        else:
+            continue
+        break
+
+    raise ValueError("{} is not a valid StepMania Stats.xml file".format(
+        getattr(statsxml, 'name', statsxml)))
+
+
+def read_summary(source):
+    """Returns a dict with every single-valued field of a Stats.xml file's
+    <GeneralData> (DisplayName, IsMachine, LastPlayedDate,
+    TotalGameplaySeconds...), as text. See read_header for the arguments."""
+    general = read_header(source).find("GeneralData")
+    return {field.tag: field.text for field in general if len(field) == 0}
+
+
+# Judgments kept on a ScoreRecord, as found in TapNoteScores and HoldNoteScores
+TIMINGS = ('W1', 'W2', 'W3', 'W4', 'W5', 'Miss', 'HitMine', 'Held', 'LetGo')
+
+
+class ScoreRecord:
+    """A HighScore of a <Steps> (usually its first one), with everything the
+    outputs need.
+
+    Judgment counts are stored under their Stats.xml names (W1, Miss, Held...)
+    so they can be read with getattr(record, timing). If the Steps has no
+    HighScore (e.g. it was only played on AutoPlay), grade is None.
+    """
+
+    __slots__ = ('song_dir', 'group', 'title', 'steps_type', 'difficulty',
+                 'percent_dp', 'grade', 'W1', 'W2', 'W3', 'W4', 'W5', 'Miss',
+                 'HitMine', 'Held', 'LetGo', 'date_time', 'modifiers', 'name')
+
+    def __init__(self, song_dir, steps_type, difficulty):
+        """Creates an empty record for a chart."""
+        # song_dir should look like "Songs/<group>/<title>/"
+        location = song_dir.split('/')
+        self.song_dir = song_dir
+        self.group = location[1]
+        self.title = location[2]
+        self.steps_type = sys.intern(steps_type)
+        self.difficulty = sys.intern(difficulty)
+        self.percent_dp = 0.0
+        self.grade = None
+        self.date_time = None
+        self.modifiers = None
+        self.name = None
+        for timing in TIMINGS:
+            setattr(self, timing, 0)
+
+    def has_score(self):
+        """Returns whether the chart has a HighScore."""
+        return self.grade is not None
 
 
-def highscore_timings(step):
-    """Returns a dict with the timings of the first HighScore of a Steps
-    ElementTree.
+def index_records(records):
+    """Returns a dict with the ScoreRecords of a song, keyed by their
+    (StepsType, Difficulty), so a chart can be looked up no matter how the
+    song's <Steps> are ordered. Only the first record of a chart is kept."""
+    index = {}
+    for record in records:
+        index.setdefault((record.steps_type, record.difficulty), record)
+    return index
+
+
+def read_highscore(record, highscore):
+    """Fills a ScoreRecord with the contents of a HighScore ElementTree,
+    walking the HighScore only once."""
+    for child in highscore:
+        if child.tag == "TapNoteScores" or child.tag == "HoldNoteScores":
+            for note in child:
+                if note.tag in TIMINGS:
+                    setattr(record, note.tag, int(note.text))
+        elif child.tag == "Grade":
+            record.grade = sys.intern(child.text)
+        elif child.tag == "PercentDP":
+            record.percent_dp = float(child.text)
+        elif child.tag == "DateTime":
+            record.date_time = child.text
+        elif child.tag == "Modifiers":
+            record.modifiers = sys.intern(child.text or "")
+        elif child.tag == "Name":
+            record.name = sys.intern(child.text or "")
+    return record
+
+
+def extract_score(song_dir, steps):
+    """Returns a ScoreRecord for the first HighScore of a Steps ElementTree.
 
     Arguments:
-    step -- the Steps ElementTree to search
+    song_dir -- the Dir attribute of the Song the Steps belongs to
+    steps    -- the Steps ElementTree to read
     """
-    notes = step.find("HighScoreList").find("HighScore").find("TapNoteScores")
-    timings = {'Miss': int(notes.find("Miss").text),
-               'W5': int(notes.find("W5").text),
-               'W4': int(notes.find("W4").text),
-               'W3': int(notes.find("W3").text),
-               'W2': int(notes.find("W2").text),
-               'W1': int(notes.find("W1").text),
-               'HitMine': int(notes.find("HitMine").text)}
-    return timings
+    record = ScoreRecord(song_dir, steps.attrib['StepsType'],
+                         steps.attrib['Difficulty'])
+
+    highscore = steps.find("HighScoreList/HighScore")
+    if highscore is None:
+        return record
+    return read_highscore(record, highscore)
 
 
-def highscore_holds(step):
-    """Returns a dict with the HoldNoteScores of the first HighScore of a
-    Steps ElementTree.
+def extract_highscores(song_dir, steps):
+    """Returns a list with a ScoreRecord for every HighScore of a Steps
+    ElementTree, which is empty if the Steps has no HighScore.
 
     Arguments:
-    step -- the Steps ElementTree to search
+    song_dir -- the Dir attribute of the Song the Steps belongs to
+    steps    -- the Steps ElementTree to read
     """
-    notes = step.find("HighScoreList").find("HighScore").find("HoldNoteScores")
-    timings = {'Held': int(notes.find("Held").text),
-               'LetGo': int(notes.find("LetGo").text)}
-    return timings
+    return [read_highscore(ScoreRecord(song_dir, steps.attrib['StepsType'],
+                                       steps.attrib['Difficulty']), highscore)
+            for highscore in steps.iterfind("HighScoreList/HighScore")]
+
+
+class StatsFile:
+    """A Stats.xml file which is streamed with iterparse instead of being
+    kept in memory as a whole.
+
+    Only <GeneralData> is kept around, as the single child of StatsFile.header
+    (see read_header), so the get_* functions above can be used on it. Songs
+    are read again from the file every time a StatsFile is iterated over,
+    unless load() was called to keep them in memory.
+    """
+
+    def __init__(self, source):
+        """Reads the header of a Stats.xml file.
+
+        Arguments:
+        source -- a path or a file object pointing to the Stats.xml file
+
+        Will raise a ValueError if the file has no <GeneralData>.
+        """
+        self.source = source
+        self.header = read_header(source)
+        self.songs = None   # (song_dir, records) of each song, once loaded
+        self.grades = None  # batch.grade_records() of scored_records(), if set
+
+    @property
+    def name(self):
+        """Returns the path of the Stats.xml file, if it's known."""
+        return getattr(self.source, 'name', self.source)
+
+    def _open(self):
+        """Returns something iterparse can read from the start of the file."""
+        if hasattr(self.source, 'read'):
+            self.source.seek(0)
+        return self.source
+
+    def load(self):
+        """Reads every song from the file and keeps them in memory."""
+        if self.songs is None:
+            self.songs = list(self._stream())
+        return self
+
+    def scored_records(self):
+        """Returns a list with every ScoreRecord that has a score, in the same
+        order they are found in the file."""
+        return [record for _, records in self for record in records
+                if record.has_score()]
+
+    def __iter__(self):
+        """Yields a (song_dir, records) tuple for each <Song> in <SongScores>,
+        where records is a list with a ScoreRecord for each of its <Steps>."""
+        if self.songs is not None:
+            return iter(self.songs)
+        return self._stream()
+
+    def iter_highscores(self):
+        """Yields a (song_dir, records) tuple for each <Song> in <SongScores>,
+        where records is a list with a ScoreRecord for every HighScore of
+        every one of its <Steps>. The file is always streamed."""
+        return self._stream(all_highscores=True)
+
+    def iter_elements(self):
+        """Yields a (song_dir, element) tuple for each <Song> in <SongScores>,
+        streamed with iterparse. Each element is cleared and removed from
+        <SongScores> as soon as the next one is asked for, so memory use
+        doesn't grow with the size of the file."""
+        # <Song> is also used outside <SongScores> (e.g. the last song played,
+        # in <GeneralData>), so the depth of each element is tracked to only
+        # yield the songs right under <SongScores>. Every event costs a trip
+        # through this loop, so as little as possible is done for each one.
+        depth = 0
+        section = None  # The child of the root element being read
+        for event, element in etree.iterparse(self._open(), ('start', 'end')):
+            if event == 'start':
+                depth += 1
+                if depth == 2:
+                    section = element
+                continue
+
+            if depth == 3 and element.tag == "Song" and \
+                    section.tag == "SongScores":
+                yield (element.attrib['Dir'], element)
+                element.clear()
+                # The song is the only child left, so this drops it as well
+                section.clear()
+            elif depth == 2 and element.tag == "CourseScores":
+                # Course scores aren't used by any of the outputs
+                element.clear()
+            depth -= 1
+
+    def _stream(self, all_highscores=False):
+        """Streams the songs of the file, turning each one into records."""
+        for song_dir, element in self.iter_elements():
+            if all_highscores:
+                records = [record for steps in element
+                           for record in extract_highscores(song_dir, steps)]
+            else:
+                records = [extract_score(song_dir, steps) for steps in element]
+            yield (song_dir, records)
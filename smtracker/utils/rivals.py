@@ -0,0 +1,286 @@
+#!/usr/bin/python3
+# Copyright (C) 2016 Renan Guilherme Lebre Ramos
+# This file is a part of smtracker.
+#
+# smtracker is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Functions for comparing the scores of many profiles on the same charts.
+
+Profiles are streamed one at a time, and only the PercentDP and grade of
+each of their scores are kept, in a hash table keyed by chart (song_dir,
+StepsType and Difficulty). Every profile added is joined with the ones before
+it through that table, so no two profiles have to be in memory at once.
+"""
+
+import heapq
+import xml.etree.ElementTree as etree
+from array import array
+from collections import namedtuple
+
+import smtracker.utils.cache as cache
+import smtracker.utils.highscores as highscores
+import smtracker.utils.parse as parse
+import smtracker.utils.systems as systems
+
+# A score on a chart's ranking: the profile's position in
+# Leaderboard.profiles, its rank on the chart (tied scores share a rank),
+# PercentDP and grade
+Entry = namedtuple('Entry', ['profile', 'rank', 'percent_dp', 'grade'])
+
+# How a profile did on every chart it shares with the others
+Standing = namedtuple('Standing', ['profile', 'charts', 'first_places', 'wins',
+                                   'losses', 'ties', 'average'])
+
+# How a profile did against a rival, on the charts both have played
+Rivalry = namedtuple('Rivalry', ['profile', 'charts', 'wins', 'losses',
+                                 'ties'])
+
+
+class Leaderboard:
+    """The scores of many profiles on the charts of a game mode."""
+
+    def __init__(self, mode, difficulties, theme):
+        """Creates an empty leaderboard.
+
+        Arguments:
+        mode         -- the game mode to compare scores from
+        difficulties -- the difficulties which should be compared
+        theme        -- which metrics should be used for grades
+        """
+        self.mode = mode
+        self.difficulties = list(difficulties)
+        self.theme = theme
+        self.system = systems.get_system(theme)
+
+        # The name and path of each profile
+        self.profiles = []
+        self.paths = []
+
+        # The chart number of each (song_dir, StepsType, Difficulty), and
+        # the key of each chart
+        self.charts = {}
+        self.keys = []
+        # For each chart, the profile, PercentDP and grade of every score on
+        # it (as positions in self.grades), in the order they were added
+        self.players = []
+        self.percents = []
+        self.grade_ids = []
+        self.grades = highscores.StringPool()
+
+    def add_name(self, name):
+        """Adds a profile name, numbering it if it's already taken."""
+        unique = name
+        copy = 1
+        while unique in self.profiles:
+            copy += 1
+            unique = "{} ({})".format(name, copy)
+        self.profiles.append(unique)
+        return len(self.profiles) - 1
+
+    def add_stats(self, stats):
+        """Adds the best score of each chart of a parse.StatsFile, which is
+        streamed. Returns the profile's position in self.profiles.
+
+        Nothing is added if the file can't be read to the end.
+        """
+        # Scores are only joined once the whole file was read, so a broken
+        # file doesn't leave half a profile behind
+        scores = []
+        wanted = set(self.difficulties)
+        for song_dir, records in stats:
+            for (steps_type, difficulty), record in \
+                    parse.index_records(records).items():
+                if (steps_type == self.mode and difficulty in wanted and
+                        record.has_score()):
+                    scores.append(((song_dir, steps_type, difficulty),
+                                   record.percent_dp,
+                                   self.grades.add(self.system.grade(record))))
+
+        profile = self.add_name(parse.get_profile_name(stats.header))
+        self.paths.append(stats.name)
+        for key, percent_dp, grade in scores:
+            chart = self.charts.get(key)
+            if chart is None:
+                chart = self.charts[key] = len(self.keys)
+                self.keys.append(key)
+                self.players.append(array('H'))
+                self.percents.append(array('d'))
+                self.grade_ids.append(array('H'))
+            self.players[chart].append(profile)
+            self.percents[chart].append(percent_dp)
+            self.grade_ids[chart].append(grade)
+        return profile
+
+    def ranking(self, chart, top=None):
+        """Returns an Entry for the best scores of a chart, from the best one
+        down.
+
+        Arguments:
+        chart -- the chart's number, as in self.charts
+        top   -- how many scores to return (every score, if None)
+        """
+        percents = self.percents[chart]
+        if top is None:
+            order = sorted(range(len(percents)), key=percents.__getitem__,
+                           reverse=True)
+        else:
+            # Only the best scores are sorted, which is all a heap needs
+            order = heapq.nlargest(top, range(len(percents)),
+                                   key=percents.__getitem__)
+
+        entries = []
+        players = self.players[chart]
+        grade_ids = self.grade_ids[chart]
+        for position, score in enumerate(order):
+            if position > 0 and percents[score] == entries[-1].percent_dp:
+                rank = entries[-1].rank
+            else:
+                rank = position + 1
+            entries.append(Entry(players[score], rank, percents[score],
+                                 self.grades[grade_ids[score]]))
+        return entries
+
+    def iter_charts(self, top=None):
+        """Yields a (song_dir, difficulty, players, entries) tuple for each
+        chart with a score, sorted by song and difficulty, where entries is
+        the chart's ranking() and players is how many profiles played it.
+        See ranking for the arguments."""
+        order = {difficulty: position
+                 for position, difficulty in enumerate(self.difficulties)}
+        for key in sorted(self.keys, key=lambda key: (key[0], order[key[2]])):
+            chart = self.charts[key]
+            yield (key[0], key[2], len(self.percents[chart]),
+                   self.ranking(chart, top))
+
+    def standings(self, top=None):
+        """Returns a Standing for each profile, ranked by their first places,
+        then by their wins and then by their average PercentDP.
+
+        Arguments:
+        top -- how many profiles to return (every profile, if None)
+
+        A profile wins against every profile with a lower PercentDP on a
+        chart, and loses against every profile with a higher one.
+        """
+        count = len(self.profiles)
+        charts = [0] * count
+        first_places = [0] * count
+        wins = [0] * count
+        losses = [0] * count
+        ties = [0] * count
+        totals = [0.0] * count
+
+        for chart in range(len(self.keys)):
+            entries = self.ranking(chart)
+            # How many scores each percentage has on this chart
+            tied = {}
+            for entry in entries:
+                tied[entry.percent_dp] = tied.get(entry.percent_dp, 0) + 1
+            for entry in entries:
+                profile = entry.profile
+                same = tied[entry.percent_dp] - 1
+                charts[profile] += 1
+                totals[profile] += entry.percent_dp
+                losses[profile] += entry.rank - 1
+                ties[profile] += same
+                wins[profile] += len(entries) - entry.rank - same
+                if entry.rank == 1:
+                    first_places[profile] += 1
+
+        standings = [Standing(profile, charts[profile], first_places[profile],
+                              wins[profile], losses[profile], ties[profile],
+                              totals[profile] / charts[profile]
+                              if charts[profile] else 0.0)
+                     for profile in range(count)]
+
+        def sort_key(standing):
+            return (standing.first_places, standing.wins, standing.average)
+        if top is None:
+            return sorted(standings, key=sort_key, reverse=True)
+        return heapq.nlargest(top, standings, key=sort_key)
+
+    def rivals(self, profile):
+        """Returns a Rivalry for each other profile, showing how a profile
+        did against them on the charts both have played, sorted by how many
+        charts they share.
+
+        Arguments:
+        profile -- the profile's position in self.profiles
+        """
+        count = len(self.profiles)
+        shared = [0] * count
+        wins = [0] * count
+        losses = [0] * count
+        ties = [0] * count
+
+        for players, percents in zip(self.players, self.percents):
+            try:
+                mine = percents[players.index(profile)]
+            except ValueError:
+                continue
+            for other, percent in zip(players, percents):
+                if other == profile:
+                    continue
+                shared[other] += 1
+                if mine > percent:
+                    wins[other] += 1
+                elif mine < percent:
+                    losses[other] += 1
+                else:
+                    ties[other] += 1
+
+        rivalries = [Rivalry(other, shared[other], wins[other], losses[other],
+                             ties[other])
+                     for other in range(count) if other != profile]
+        rivalries.sort(key=lambda rivalry: rivalry.charts, reverse=True)
+        return rivalries
+
+    def find_profile(self, name):
+        """Returns the position of a profile in self.profiles.
+
+        Will raise a ValueError if there's no profile with that name.
+        """
+        try:
+            return self.profiles.index(name)
+        except ValueError:
+            raise ValueError("{} is not one of the compared profiles".format(
+                name))
+
+
+def read_leaderboard(paths, mode, difficulties, theme, use_cache=True):
+    """Returns a Leaderboard with every profile found in paths (Stats.xml
+    files, or folders with profiles in them), read one at a time.
+
+    Arguments:
+    paths        -- Stats.xml files, or folders with profiles in them
+    mode         -- the game mode to compare scores from
+    difficulties -- the difficulties which should be compared
+    theme        -- which metrics should be used for grades
+    use_cache    -- whether the cache can be used (a cached profile is
+                    loaded as a whole, but only until the next one is read)
+
+    Files which aren't valid Stats.xml files are skipped, and returned as a
+    list of (path, error) tuples along with the Leaderboard.
+    """
+    board = Leaderboard(mode, difficulties, theme)
+    skipped = []
+    for path in parse.find_profiles(paths):
+        try:
+            stats = parse.StatsFile(path)
+            if use_cache:
+                cache.load_stats(stats)
+            board.add_stats(stats)
+        except (OSError, ValueError, etree.ParseError) as error:
+            skipped.append((path, str(error)))
+    return board, skipped
@@ -0,0 +1,558 @@
+#!/usr/bin/python3
+# Copyright (C) 2016 Renan Guilherme Lebre Ramos
+# This file is a part of smtracker.
+#
+# smtracker is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""The grading systems smtracker knows about.
+
+Every grading system is a table: how much each judgment is worth, the
+minimum value for each tier, and the grade for each tier. Outputs, the
+command line and the batch grader all get their grading systems from here,
+and users can add their own with a JSON file (see load_systems).
+"""
+
+import json
+import os
+import sys
+from bisect import bisect_right
+from collections import namedtuple
+from functools import lru_cache
+from itertools import repeat
+from operator import attrgetter, mul
+
+import smtracker.utils.parse as parse
+import smtracker.utils.score as score
+
+# TODO: These tiers are somewhat naive and may display values that don't match
+# with what you see on your game. However, they may be useful to convert
+# grades from one system to another, and they prevent issues regarding
+# grading systems having a different quantity of tiers.
+# Maybe there should be a "don't calculate tier" option that just uses the
+# tier on the Stats.xml file.
+
+# Timings which are counted as notes by most systems
+NOTES = ('W1', 'W2', 'W3', 'W4', 'W5', 'Miss')
+
+# How many results the grading systems remember (one for each system a score
+# was graded with, around 250 bytes each). Scores with the same judgment
+# counts come up again and again (every full combo of a chart, or the same
+# profile graded again), and those don't have to be graded at all.
+MEMO_SIZE = 2 ** 16
+
+_get_counts = attrgetter(*parse.TIMINGS)
+
+# Everything a grading system looks at when grading a score
+_Counts = namedtuple('_Counts', parse.TIMINGS + ('grade', 'difficulty'))
+
+
+class GradingSystem:
+    """A grading system, which turns the judgments of a score into a tier,
+    and a tier into a grade."""
+
+    def __init__(self, name, judgments, grades, bottom_tier, ladder,
+                 weights=None, notes=NOTES, max_weight=None,
+                 difficulty_ladders=None, perfect_tier=None, fails=True,
+                 score_function=None, score_label=None,
+                 graded_by_score=False):
+        """Creates a grading system.
+
+        Arguments:
+        name               -- the name used by -t and the Qt interface
+        judgments          -- a dict with a name for each timing (W1...Miss)
+        grades             -- a dict with the grade for each tier
+        bottom_tier        -- the tier for values under every minimum
+        ladder             -- a list of (minimum, tier) tuples, sorted by
+                              their minimum
+        weights            -- a dict with how many points each timing is worth
+        notes              -- the timings counted as notes
+        max_weight         -- how many points a note is worth at most
+                              (defaults to weights['W1'])
+        difficulty_ladders -- a dict with ladders which replace the ladder for
+                              some difficulties
+        perfect_tier       -- the tier given instead of the top one to scores
+                              with any W2
+        fails              -- whether failed scores always get the Failed tier
+        score_function     -- a function which calculates the score shown
+                              for this system, if it has one
+        score_label        -- what the score is called
+        graded_by_score    -- whether the ladder is climbed with the score
+                              instead of the percentage of points
+        """
+        self.name = name
+        self.judgments = dict(judgments)
+        self.grades = dict(grades)
+        self.bottom_tier = bottom_tier
+        self.ladder = tuple(ladder)
+        self.weights = dict(weights or {})
+        self.notes = tuple(notes)
+        if max_weight is None:
+            max_weight = self.weights.get('W1', 1)
+        self.max_weight = max_weight
+        self.difficulty_ladders = {difficulty: tuple(difficulty_ladder)
+                                   for difficulty, difficulty_ladder
+                                   in (difficulty_ladders or {}).items()}
+        self.perfect_tier = perfect_tier
+        self.fails = fails
+        self.score_function = score_function
+        self.score_label = score_label
+        self.graded_by_score = graded_by_score
+
+        if graded_by_score and score_function is None:
+            raise ValueError("{} is graded by score, but has no score "
+                             "function".format(name))
+
+        # Minimums and tiers, split for bisect
+        self._minimums, self._tiers = self._split_ladder(self.ladder)
+        self._difficulty_ladders = {difficulty: self._split_ladder(ladder)
+                                    for difficulty, ladder
+                                    in self.difficulty_ladders.items()}
+
+        # Systems graded by score don't need any weights
+        if not graded_by_score:
+            if not self.weights or not self.notes:
+                raise ValueError("{} needs weights and notes".format(name))
+            self._get_notes = attrgetter(*self.notes)
+            weighted = tuple(self.weights)
+            self._get_weighted = attrgetter(*weighted)
+            self._weight_values = tuple(self.weights[timing]
+                                        for timing in weighted)
+
+    def _split_ladder(self, ladder):
+        """Returns the minimums of a ladder, and every tier from the bottom."""
+        minimums = [minimum for minimum, _ in ladder]
+        if minimums != sorted(minimums):
+            raise ValueError("The tiers of {} are not sorted by their "
+                             "minimum".format(self.name))
+        return minimums, [self.bottom_tier] + [tier for _, tier in ladder]
+
+    def points(self, record):
+        """Returns the fraction of the maximum points a record scored (0 if it
+        has no notes). Only works for systems which aren't graded by score."""
+        if len(self.notes) == 1:
+            note_count = self._get_notes(record)
+        else:
+            note_count = sum(self._get_notes(record))
+        if note_count == 0:
+            return 0.0
+
+        if len(self._weight_values) == 1:
+            point_count = self._weight_values[0] * self._get_weighted(record)
+        else:
+            point_count = sum(map(mul, self._weight_values,
+                                  self._get_weighted(record)))
+        return point_count / (self.max_weight * note_count)
+
+    def calculate_score(self, record):
+        """Calculates the system's score for a record, or returns None if the
+        system doesn't have scores (or the record has no notes)."""
+        if self.score_function is None:
+            return None
+        return self.score_function(record)
+
+    def calculate_tier(self, record, score=None):
+        """Calculates the tier of a parse.ScoreRecord (or anything with the
+        same judgment, grade and difficulty attributes).
+
+        Arguments:
+        record -- the parse.ScoreRecord to grade
+        score  -- the record's calculate_score(), if it's already known
+        """
+        # If the file says we failed, then we failed
+        if self.fails and record.grade == "Failed":
+            return "Failed"
+
+        if self.graded_by_score:
+            value = score if score is not None else self.score_function(record)
+            # A score can't be calculated without notes
+            if value is None:
+                return self.bottom_tier
+        else:
+            value = self.points(record)
+
+        minimums, tiers = self._difficulty_ladders.get(
+            record.difficulty, (self._minimums, self._tiers))
+        position = bisect_right(minimums, value)
+        if (position == len(minimums) and self.perfect_tier is not None and
+                record.W2 >= 1):
+            return self.perfect_tier
+        return tiers[position]
+
+    def evaluate(self, record):
+        """Returns the (tier, grade, score) of a parse.ScoreRecord, from the
+        memo if a score with the same judgments was already graded."""
+        return _evaluate(
+            self, _get_counts(record),
+            self.fails and record.grade == "Failed",
+            record.difficulty if self.difficulty_ladders else None)
+
+    def tier(self, record):
+        """Returns the tier of a parse.ScoreRecord."""
+        return self.evaluate(record)[0]
+
+    def grade(self, record):
+        """Returns the grade of a parse.ScoreRecord."""
+        return self.evaluate(record)[1]
+
+    def score(self, record):
+        """Returns the system's score for a parse.ScoreRecord, or None if the
+        system doesn't have scores."""
+        return self.evaluate(record)[2]
+
+    def tier_to_grade(self, tier):
+        """Converts a tier to a grade."""
+        return self.grades.get(tier, "?")
+
+    def judgment_name(self, timing):
+        """Returns an human-readable name for a timing (W1...Miss)."""
+        return self.judgments.get(timing, "?")
+
+    def get_signature(self):
+        """Returns something which only compares equal for systems which
+        grade everything the same way."""
+        return (self.name, sorted(self.weights.items()), self.notes,
+                self.max_weight, self.ladder, self.bottom_tier,
+                sorted(self.difficulty_ladders.items()),
+                sorted(self.grades.items()), self.perfect_tier, self.fails,
+                getattr(self.score_function, '__name__', None),
+                self.graded_by_score)
+
+
+# Names for each timing, according to each game
+SM5_JUDGMENTS = {'W1': 'Flawless', 'W2': 'Perfect', 'W3': 'Great',
+                 'W4': 'Good', 'W5': 'Bad', 'Miss': 'Miss'}
+ITG_JUDGMENTS = {'W1': 'Fantastic', 'W2': 'Excellent', 'W3': 'Great',
+                 'W4': 'Decent', 'W5': 'Way Off', 'Miss': 'Miss'}
+SUPERNOVA2_JUDGMENTS = {'W1': 'Marvelous', 'W2': 'Perfect', 'W3': 'Great',
+                        'W4': 'Good', 'W5': 'Boo', 'Miss': 'Miss'}
+DDRA_JUDGMENTS = {'W1': 'Marvelous', 'W2': 'Perfect', 'W3': 'Great',
+                  'W4': 'Good', 'W5': 'Miss', 'Miss': 'Miss'}
+IIDX_JUDGMENTS = {'W1': 'PGreat', 'W2': 'Great', 'W3': 'Good',
+                  'W4': 'Bad', 'W5': 'Bad', 'Miss': 'Poor'}
+
+# Here's an explanation of how StepMania calculates its grades:
+# https://zenius-i-vanisher.com/v5.2/viewthread.php?threadid=6582#p349466
+SM5 = GradingSystem(
+    'sm5', SM5_JUDGMENTS,
+    weights={'Miss': -8, 'W5': -4, 'W4': 0, 'W3': 1, 'W2': 2, 'W1': 2},
+    # AAAA is Marvelous Full Combo, AAA is Perfect Full Combo
+    bottom_tier='Tier07',
+    ladder=[(0.45, 'Tier06'), (0.65, 'Tier05'), (0.80, 'Tier04'),
+            (0.93, 'Tier03'), (1.0, 'Tier01')],
+    perfect_tier='Tier02',
+    grades={'Failed': 'F', 'Tier07': 'D', 'Tier06': 'C', 'Tier05': 'B',
+            'Tier04': 'A', 'Tier03': 'AA', 'Tier02': 'AAA', 'Tier01': 'AAAA'})
+
+SM51 = GradingSystem(
+    'sm5.1', SM5_JUDGMENTS,
+    weights={'Miss': -8, 'W5': -4, 'W4': 0, 'W3': 1, 'W2': 2, 'W1': 2,
+             'HitMine': -8},
+    bottom_tier='Tier17',
+    ladder=[(0.55, 'Tier16'), (0.60, 'Tier15'), (0.64, 'Tier14'),
+            (0.68, 'Tier13'), (0.72, 'Tier12'), (0.76, 'Tier11'),
+            (0.80, 'Tier10'), (0.83, 'Tier09'), (0.86, 'Tier08'),
+            (0.89, 'Tier07'), (0.92, 'Tier06'), (0.94, 'Tier05'),
+            (0.96, 'Tier04'), (0.98, 'Tier03'), (1.0, 'Tier01')],
+    perfect_tier='Tier02',
+    grades={'Failed': 'F', 'Tier17': 'D-', 'Tier16': 'D', 'Tier15': 'D+',
+            'Tier14': 'C-', 'Tier13': 'C', 'Tier12': 'C+', 'Tier11': 'B-',
+            'Tier10': 'B', 'Tier09': 'B+', 'Tier08': 'A-', 'Tier07': 'A',
+            'Tier06': 'A+', 'Tier05': 'AA-', 'Tier04': 'AA', 'Tier03': 'AA+',
+            'Tier02': 'AAA', 'Tier01': 'AAA*'})
+
+# ITG/Simply Love also counts hold notes as notes
+ITG = GradingSystem(
+    'itg', ITG_JUDGMENTS,
+    weights={'Miss': -12, 'W5': -6, 'W4': 0, 'W3': 2, 'W2': 4, 'W1': 5,
+             'Held': 5, 'LetGo': 0, 'HitMine': -6},
+    notes=NOTES + ('Held', 'LetGo'),
+    bottom_tier='Tier17',
+    ladder=[(0.55, 'Tier16'), (0.60, 'Tier15'), (0.64, 'Tier14'),
+            (0.68, 'Tier13'), (0.72, 'Tier12'), (0.76, 'Tier11'),
+            (0.80, 'Tier10'), (0.83, 'Tier09'), (0.86, 'Tier08'),
+            (0.89, 'Tier07'), (0.92, 'Tier06'), (0.94, 'Tier05'),
+            (0.96, 'Tier04'), (0.98, 'Tier03'), (0.99, 'Tier02'),
+            (1.00, 'Tier01')],
+    grades={'Failed': 'F', 'Tier17': 'D', 'Tier16': 'C-', 'Tier15': 'C',
+            'Tier14': 'C+', 'Tier13': 'B-', 'Tier12': 'B', 'Tier11': 'B+',
+            'Tier10': 'A-', 'Tier09': 'A', 'Tier08': 'A+', 'Tier07': 'S-',
+            'Tier06': 'S', 'Tier05': 'S+', 'Tier04': '★', 'Tier03': '★★',
+            'Tier02': '★★★', 'Tier01': '★★★★'})
+
+# Here's how SuperNOVA2 calculates scores and grades:
+# https://remywiki.com/DanceDanceRevolution_SuperNOVA2_Scoring_System
+# AAA and AA are always 990000 and 950000, respectively. Tiers from A to C have
+# flexible score requirements, depending on the difficulty of a chart.
+SUPERNOVA2 = GradingSystem(
+    'supernova2', SUPERNOVA2_JUDGMENTS,
+    score_function=score.calculate_score_supernova2,
+    score_label='DDR SN2 Score',
+    graded_by_score=True,
+    bottom_tier='Tier06',
+    ladder=[(700000, 'Tier05'), (800000, 'Tier04'), (900000, 'Tier03'),
+            (950000, 'Tier02'), (990000, 'Tier01')],
+    difficulty_ladders={
+        'Medium': [(600000, 'Tier05'), (750000, 'Tier04'), (850000, 'Tier03'),
+                   (950000, 'Tier02'), (990000, 'Tier01')],
+        'Easy': [(500000, 'Tier05'), (700000, 'Tier04'), (800000, 'Tier03'),
+                 (950000, 'Tier02'), (990000, 'Tier01')],
+        'Beginner': [(500000, 'Tier05'), (700000, 'Tier04'),
+                     (800000, 'Tier03'), (950000, 'Tier02'),
+                     (990000, 'Tier01')]},
+    grades={'Failed': 'E', 'Tier06': 'D', 'Tier05': 'C', 'Tier04': 'B',
+            'Tier03': 'A', 'Tier02': 'AA', 'Tier01': 'AAA'})
+
+DDRA = GradingSystem(
+    'ddra', DDRA_JUDGMENTS,
+    score_function=score.calculate_score_ddra,
+    score_label='DDR A Score',
+    graded_by_score=True,
+    bottom_tier='Tier15',
+    ladder=[(550000, 'Tier14'), (590000, 'Tier13'), (600000, 'Tier12'),
+            (650000, 'Tier11'), (690000, 'Tier10'), (700000, 'Tier09'),
+            (750000, 'Tier08'), (790000, 'Tier07'), (800000, 'Tier06'),
+            (850000, 'Tier05'), (890000, 'Tier04'), (900000, 'Tier03'),
+            (950000, 'Tier02'), (990000, 'Tier01')],
+    grades={'Failed': 'E', 'Tier15': 'D', 'Tier14': 'D+', 'Tier13': 'C-',
+            'Tier12': 'C', 'Tier11': 'C+', 'Tier10': 'B-', 'Tier09': 'B',
+            'Tier08': 'B+', 'Tier07': 'A-', 'Tier06': 'A', 'Tier05': 'A+',
+            'Tier04': 'AA-', 'Tier03': 'AA', 'Tier02': 'AA+', 'Tier01': 'AAA'})
+
+# Some information on how IIDX calculates its grades (section III.B.):
+# http://www.gamefaqs.com/ps2/932320-beatmania-iidx-11-iidx-red/faqs/42900
+# Also on RemyWiki:
+# https://remywiki.com/IIDX_General_Info
+# Grades come from the EX score, out of 2 points per note. This may not be
+# arcade-accurate for songs with hold notes, as IIDX has lift notes at the end
+# of each hold note, while StepMania does not (at least as of 5.0.11).
+# In IIDX, passing and failing is largely irrelevant: the arcade will give you
+# a grade even if you fail a song, unlike DDR which always gives you an E.
+IIDX = GradingSystem(
+    'iidx', IIDX_JUDGMENTS,
+    weights={'W1': 2, 'W2': 1},
+    fails=False,
+    score_function=score.calculate_score_iidx,
+    score_label='IIDX EX Score',
+    bottom_tier='Tier08',
+    ladder=[(2/9, 'Tier07'), (3/9, 'Tier06'), (4/9, 'Tier05'),
+            (5/9, 'Tier04'), (6/9, 'Tier03'), (7/9, 'Tier02'),
+            (8/9, 'Tier01')],
+    grades={'Failed': 'F', 'Tier08': 'F', 'Tier07': 'E', 'Tier06': 'D',
+            'Tier05': 'C', 'Tier04': 'B', 'Tier03': 'A', 'Tier02': 'AA',
+            'Tier01': 'AAA'})
+
+@lru_cache(maxsize=MEMO_SIZE)
+def _evaluate(system, counts, failed, difficulty):
+    """Grades a score with a grading system, remembering the result for the
+    next score with the same arguments.
+
+    Arguments:
+    system     -- the GradingSystem to grade with
+    counts     -- the score's judgment counts, in the order of parse.TIMINGS
+    failed     -- whether the score failed, for systems where that matters
+    difficulty -- the chart's difficulty, for systems where that matters
+    """
+    record = _Counts._make(counts + ("Failed" if failed else None, difficulty))
+    # Scores without notes (like a Failed score with no judgments at all) get
+    # None instead of a score, and failed ones get the Failed tier before the
+    # score is ever looked at
+    score = system.calculate_score(record)
+    tier = system.calculate_tier(record, score)
+    return (tier, system.tier_to_grade(tier), score)
+
+
+def evaluate_many(system, counts, failed, difficulties):
+    """Returns a list with the (tier, grade, score) of many scores, graded
+    with a grading system through the memo.
+
+    Arguments:
+    system       -- the GradingSystem to grade with
+    counts       -- a tuple of judgment counts for each score, in the order of
+                    parse.TIMINGS
+    failed       -- whether each score failed
+    difficulties -- the difficulty of each score's chart
+    """
+    if not system.fails:
+        failed = repeat(False)
+    if not system.difficulty_ladders:
+        difficulties = repeat(None)
+    return list(map(_evaluate, repeat(system), counts, failed, difficulties))
+
+
+def get_memo_stats():
+    """Returns a dict with how many grades were found in the memo ('hits'),
+    how many had to be calculated ('misses'), and how many it holds ('size',
+    out of 'max_size')."""
+    info = _evaluate.cache_info()
+    return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize,
+            'max_size': info.maxsize}
+
+
+def clear_memo():
+    """Forgets every remembered grade."""
+    _evaluate.cache_clear()
+
+
+# Every known grading system, by name
+SYSTEMS = {}
+
+
+def register(system):
+    """Adds a grading system to SYSTEMS, replacing any other with its name."""
+    SYSTEMS[system.name] = system
+
+
+for _system in (SM5, SM51, ITG, SUPERNOVA2, DDRA, IIDX):
+    register(_system)
+
+
+def get_system(name):
+    """Returns a grading system by its name.
+
+    Will raise a ValueError if there's no such system.
+    """
+    try:
+        return SYSTEMS[name]
+    except KeyError:
+        raise ValueError("{} is not a valid grading system.".format(name))
+
+
+def get_names():
+    """Returns the names of every grading system, in the order they were
+    registered."""
+    return tuple(SYSTEMS)
+
+
+def get_signature():
+    """Returns something which only compares equal while the known grading
+    systems stay the same."""
+    return tuple(system.get_signature() for system in SYSTEMS.values())
+
+
+def get_config_location():
+    """Returns where smtracker looks for user-defined grading systems."""
+    if sys.platform.startswith('win32') or sys.platform.startswith('cygwin'):
+        base = os.environ.get('APPDATA', '')
+    else:
+        base = os.environ.get('XDG_CONFIG_HOME')
+        if not base:
+            base = os.path.join(os.environ['HOME'], ".config")
+    return os.path.join(base, "smtracker", "systems.json")
+
+
+def _is_number(value):
+    """Returns whether a value read from JSON is a number."""
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def from_config(entry):
+    """Creates a grading system from an entry of a systems file.
+
+    An entry looks like this:
+
+        {"name": "mine",
+         "weights": {"W1": 3, "W2": 2, "W3": 1, "W5": -4, "Miss": -8},
+         "grades": [["D", 0], ["C", 0.6], ["B", 0.8], ["A", 0.9], ["S", 1.0]],
+         "failed": "F",
+         "judgments": {"W1": "Marvelous", "W2": "Perfect"},
+         "notes": ["W1", "W2", "W3", "W4", "W5", "Miss", "Held", "LetGo"]}
+
+    Grades are sorted by the percentage of points needed for them, and the
+    first one is given to anything below the second one. Scores are worth
+    the weight of their judgments, out of the weight of W1 for every note.
+    "failed" is the grade for failed scores (leave it out to ignore fails),
+    and "judgments" and "notes" are optional.
+
+    Will raise a ValueError if the entry is invalid.
+    """
+    try:
+        name = entry['name']
+        grades = [(grade, minimum) for grade, minimum in entry['grades']]
+        weights = {timing: weight for timing, weight in entry['weights'].items()}
+    except (KeyError, TypeError, ValueError, AttributeError):
+        raise ValueError("A grading system needs a name, weights and grades")
+
+    if not grades:
+        raise ValueError("{} has no grades".format(name))
+    if not all(_is_number(minimum) for _, minimum in grades):
+        raise ValueError("{}: the minimum of each grade should be a "
+                         "number".format(name))
+    if any(later < earlier
+           for (_, earlier), (_, later) in zip(grades, grades[1:])):
+        raise ValueError("{}: grades should go from the worst to the "
+                         "best".format(name))
+
+    try:
+        notes = tuple(entry.get('notes', NOTES))
+    except TypeError:
+        raise ValueError("{}: notes should be a list of judgments".format(name))
+    for timing in list(weights) + list(notes):
+        if timing not in parse.TIMINGS:
+            raise ValueError("{}: {} is not a judgment (use one of {})".format(
+                name, timing, ", ".join(parse.TIMINGS)))
+    if not all(_is_number(weight) for weight in weights.values()):
+        raise ValueError("{}: the weight of each judgment should be a "
+                         "number".format(name))
+    if weights.get('W1', 1) <= 0:
+        raise ValueError("{}: W1 should be worth more than 0".format(name))
+
+    # Tiers are numbered from the best grade, like StepMania does
+    tiers = ["Tier{:02}".format(len(grades) - position)
+             for position in range(len(grades))]
+    grade_table = dict(zip(tiers, (grade for grade, _ in grades)))
+    if 'failed' in entry:
+        grade_table['Failed'] = entry['failed']
+
+    judgments = dict(SM5_JUDGMENTS)
+    judgments.update(entry.get('judgments', {}))
+
+    return GradingSystem(
+        name, judgments, grade_table,
+        weights=weights,
+        notes=notes,
+        bottom_tier=tiers[0],
+        ladder=[(minimum, tier) for (_, minimum), tier
+                in zip(grades[1:], tiers[1:])],
+        fails='failed' in entry)
+
+
+def load_systems(path):
+    """Registers the grading systems in a JSON file, which has a list of
+    entries as described in from_config. Returns their names.
+
+    Will raise a ValueError if the file can't be read or is invalid.
+    """
+    try:
+        with open(path, encoding='utf-8') as systems_file:
+            entries = json.load(systems_file)
+    except (OSError, ValueError) as error:
+        raise ValueError("Could not read grading systems from {}: {}".format(
+            path, error))
+    if not isinstance(entries, list):
+        raise ValueError("{} should have a list of grading systems".format(path))
+
+    loaded = [from_config(entry) for entry in entries]
+    for system in loaded:
+        register(system)
+    return [system.name for system in loaded]
+
+
+def load_user_systems(path=None):
+    """Registers the user's grading systems, from path or from the default
+    location, if there's a file there. Returns their names."""
+    if path is None:
+        path = get_config_location()
+        if not os.path.isfile(path):
+            return []
+    return load_systems(path)
@@ -0,0 +1,167 @@
+#!/usr/bin/python3
+# Copyright (C) 2016 Renan Guilherme Lebre Ramos
+# This file is a part of smtracker.
+#
+# smtracker is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Functions for timing the phases of a run (locating, parsing, grading,
+rendering...).
+
+Any part of smtracker can wrap some work in a phase:
+
+    with timing.phase("render"):
+        ...
+
+Phases cost nothing unless timing was started with start(). Phases started
+inside other phases are kept as their sub-phases. Work done a little at a
+time, like reading a file as it's streamed, can be added up into a single
+phase with repeat=True (or timed(), for the items of an iterator).
+"""
+
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# The Timings being recorded, if timing was started
+_current = None
+
+# Marks the end of an iterator in timed()
+_END = object()
+
+
+class Timings:
+    """The wall time and peak memory of each phase of a run."""
+
+    def __init__(self):
+        """Creates an empty list of phases."""
+        # A dict for each phase (name, depth, seconds, peak_memory), in the
+        # order the phases were started
+        self.phases = []
+        # The phases which haven't ended yet
+        self.stack = []
+        # Other statistics of the run, as dicts of numbers keyed by name
+        self.counters = {}
+        # The repeated phases started outside of any other phase, by name
+        self.repeats = {}
+
+    @contextmanager
+    def phase(self, name, repeat=False):
+        """Records how long the code inside the block takes, and the most
+        memory it allocates at once.
+
+        Arguments:
+        name   -- the name of the phase
+        repeat -- whether the block should be added to the phase with the
+                  same name already started inside the same phase, if
+                  there's one, instead of being recorded on its own
+        """
+        repeats = self.stack[-1]['repeats'] if self.stack else self.repeats
+        entry = repeats.get(name) if repeat else None
+        if entry is None:
+            entry = {'name': name, 'depth': len(self.stack), 'seconds': None,
+                     'peak_memory': None}
+            self.phases.append(entry)
+            if repeat:
+                repeats[name] = entry
+        # The highest peak of the phase's sub-phases, and of the phase itself
+        # before each sub-phase reset the peak
+        frame = {'child_peak': 0, 'repeats': {}}
+        if self.stack:
+            parent = self.stack[-1]
+            parent['child_peak'] = max(parent['child_peak'],
+                                       tracemalloc.get_traced_memory()[1])
+        self.stack.append(frame)
+
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield entry
+        finally:
+            seconds = time.perf_counter() - start
+            peak = max(tracemalloc.get_traced_memory()[1], frame['child_peak'])
+            if entry['seconds'] is not None:
+                seconds += entry['seconds']
+                peak = max(peak, entry['peak_memory'])
+            entry['seconds'] = seconds
+            entry['peak_memory'] = peak
+            self.stack.pop()
+            if self.stack:
+                parent = self.stack[-1]
+                parent['child_peak'] = max(parent['child_peak'], peak)
+
+    def report(self, dest):
+        """Writes a table with every phase to a text file object."""
+        dest.write("{:30} {:>10} {:>12}\n".format("Phase", "Time (s)",
+                                                 "Peak (MiB)"))
+        for entry in self.phases:
+            if entry['seconds'] is None:
+                continue
+            name = "  " * entry['depth'] + entry['name']
+            dest.write("{:30} {:10.3f} {:12.2f}\n".format(
+                name, entry['seconds'], entry['peak_memory'] / 2 ** 20))
+        for name, values in self.counters.items():
+            dest.write("{}: {}\n".format(name, ", ".join(
+                "{}={}".format(key, value) for key, value in values.items())))
+
+    def save(self, dest):
+        """Writes every phase as JSON to a text file object."""
+        json.dump({'phases': self.phases, 'counters': self.counters}, dest,
+                  indent=2)
+
+
+def start():
+    """Starts recording phases (and tracing memory allocations, which makes
+    everything a bit slower)."""
+    global _current
+    _current = Timings()
+    tracemalloc.start()
+
+
+def stop():
+    """Stops recording phases, and returns the Timings recorded since
+    start(), or None if timing wasn't started."""
+    global _current
+    timings = _current
+    _current = None
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    return timings
+
+
+@contextmanager
+def phase(name, repeat=False):
+    """Records a phase, if timing was started. See Timings.phase."""
+    if _current is None:
+        yield None
+    else:
+        with _current.phase(name, repeat) as entry:
+            yield entry
+
+
+def timed(name, iterable):
+    """Yields the items of an iterable, adding the time taken to get each one
+    up into a single phase (see Timings.phase), if timing was started. The
+    time spent on each item once it's yielded isn't part of the phase."""
+    if _current is None:
+        yield from iterable
+        return
+
+    iterator = iter(iterable)
+    while True:
+        with _current.phase(name, repeat=True):
+            item = next(iterator, _END)
+        if item is _END:
+            return
+        yield item
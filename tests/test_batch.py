@@ -0,0 +1,50 @@
+#!/usr/bin/python3
+# Copyright (C) 2016 Renan Guilherme Lebre Ramos
+# This file is a part of smtracker.
+#
+# smtracker is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for grading many scores at once."""
+
+import unittest
+
+import smtracker.utils.batch as batch
+import smtracker.utils.systems as systems
+from tests.test_systems import make_record
+
+
+class NoNotesTest(unittest.TestCase):
+    """Scores without a single judgment, which are still valid records."""
+
+    def setUp(self):
+        systems.clear_memo()
+        self.records = [make_record("Failed"), make_record("Tier17"),
+                        make_record("Failed", difficulty="Beginner"),
+                        make_record("Tier17", difficulty="Edit")]
+
+    def test_every_system(self):
+        """Every grading system grades them. DDR scores need notes, so they
+        are left empty."""
+        graded = batch.grade_records(self.records)
+        self.assertEqual(set(graded['grades']), set(systems.SYSTEMS))
+        for name, grades in graded['grades'].items():
+            self.assertEqual(len(grades), len(self.records), name)
+        for name in ('supernova2', 'ddra'):
+            self.assertEqual(graded['scores'][name],
+                             [None] * len(self.records), name)
+        self.assertEqual(graded['scores']['iidx'], [0] * len(self.records))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+#!/usr/bin/python3
+# Copyright (C) 2016 Renan Guilherme Lebre Ramos
+# This file is a part of smtracker.
+#
+# smtracker is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for exporting scores."""
+
+import unittest
+
+import smtracker.output.export as export
+import smtracker.utils.systems as systems
+from tests.test_systems import make_record
+
+
+class NoNotesTest(unittest.TestCase):
+    """Exporting a score without a single judgment."""
+
+    def setUp(self):
+        systems.clear_memo()
+
+    def test_scores_are_none(self):
+        """Scores which need notes are exported as None."""
+        record = make_record("Failed", percent_dp=0.0)
+        stats = [("Songs/Group/Title/", [record])]
+        charts = list(export.iter_charts(stats, "dance-single", ["Hard"],
+                                         "ddra"))
+        self.assertEqual(len(charts), 1)
+        chart = dict(zip(export.get_fields(), charts[0]))
+        self.assertEqual(chart['difficulty'], "Hard")
+        self.assertIsNone(chart['supernova2_score'])
+        self.assertIsNone(chart['ddra_score'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+#!/usr/bin/python3
+# Copyright (C) 2016 Renan Guilherme Lebre Ramos
+# This file is a part of smtracker.
+#
+# smtracker is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for the history database."""
+
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import smtracker.utils.history as history
+
+# A score as the first versions of the database stored it, with an empty
+# grade
+OLD_ROW = ("Guid", "Songs/Group/Title/", "dance-single", "Hard",
+           "2016-01-01 00:00:00", "Player", 0, "", 0.5) + (0,) * 9 + ("",)
+
+
+class OldSchemaTest(unittest.TestCase):
+    """Databases created when the grade column couldn't be NULL."""
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.path = os.path.join(folder.name, "history.db")
+        connection = sqlite3.connect(self.path)
+        connection.executescript(history.SCHEMA.replace("grade TEXT,",
+                                                        "grade TEXT NOT NULL,"))
+        connection.execute("INSERT INTO scores VALUES ({})".format(
+            ", ".join("?" * len(OLD_ROW))), OLD_ROW)
+        connection.commit()
+        connection.close()
+
+    def test_migrated(self):
+        """The grade column can be NULL once the database is opened, and
+        the scores already in it are kept."""
+        connection = history.connect(self.path)
+        self.addCleanup(connection.close)
+        columns = {row[1]: row[3]
+                   for row in connection.execute("PRAGMA table_info(scores)")}
+        self.assertEqual(columns['grade'], 0)
+        self.assertEqual(connection.execute(
+            "SELECT name, grade, percent_dp FROM scores").fetchall(),
+            [("Player", None, 0.5)])
+        indexes = {row[0] for row in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND "
+            "tbl_name = 'scores'")}
+        self.assertLessEqual({'scores_by_chart', 'scores_by_date'}, indexes)
+
+    def test_opened_again(self):
+        """Opening a migrated database doesn't change it again."""
+        history.connect(self.path).close()
+        connection = history.connect(self.path)
+        self.addCleanup(connection.close)
+        self.assertEqual(connection.execute(
+            "SELECT COUNT(*) FROM scores").fetchone(), (1,))
+
+
+if __name__ == '__main__':
+    unittest.main()
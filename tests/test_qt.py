@@ -0,0 +1,118 @@
+#!/usr/bin/python3
+# Copyright (C) 2016 Renan Guilherme Lebre Ramos
+# This file is a part of smtracker.
+#
+# smtracker is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for the Qt viewer, which run without a display."""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+try:
+    from PyQt5.QtWidgets import QApplication
+except ImportError:
+    QApplication = None
+else:
+    import smtracker.output.qt as qt
+
+import smtracker.utils.parse as parse
+
+STATS = """<?xml version="1.0"?>
+<Stats><GeneralData><DisplayName>{name}</DisplayName><IsMachine>0</IsMachine>
+<LastPlayedDate>2016-01-01</LastPlayedDate>
+<TotalGameplaySeconds>10</TotalGameplaySeconds></GeneralData>
+<SongScores><Song Dir="Songs/Group/Title/">
+<Steps Difficulty="Hard" StepsType="dance-single"><HighScoreList><HighScore>
+<Name>{name}</Name><Grade>Tier02</Grade><PercentDP>0.950000</PercentDP>
+<TapNoteScores><W1>90</W1><W2>10</W2><W3>0</W3><W4>0</W4><W5>0</W5>
+<Miss>0</Miss><HitMine>0</HitMine></TapNoteScores>
+<HoldNoteScores><Held>0</Held><LetGo>0</LetGo></HoldNoteScores>
+</HighScore></HighScoreList></Steps></Song></SongScores></Stats>
+"""
+
+
+@unittest.skipIf(QApplication is None, "PyQt5 is not installed")
+class OpenProfileTest(unittest.TestCase):
+    """Opening profiles one after another in the same window."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+
+    def make_stats(self, name, load=True):
+        """Writes a Stats.xml file and returns its parse.StatsFile, which is
+        already loaded if load is True."""
+        path = os.path.join(self.folder.name, name + ".xml")
+        with open(path, 'w', encoding='utf-8') as stats_file:
+            stats_file.write(STATS.format(name=name))
+        stats = parse.StatsFile(path)
+        return stats.load() if load else stats
+
+    def test_forgets_previous_profile(self):
+        """Only the profile being shown is kept."""
+        viewer = qt.Viewer(self.make_stats("First"), "dance-single",
+                           ["Hard"], "sm5")
+        self.addCleanup(viewer.close)
+        second = self.make_stats("Second")
+        viewer.set_stats(second)
+        self.assertEqual(viewer.model.saved, {})
+        self.assertIs(viewer.model.stats, second)
+
+    def test_no_cache(self):
+        """Profiles opened without the cache are read from the file."""
+        with mock.patch.object(qt.cache, 'load_stats') as load_stats:
+            viewer = qt.Viewer(self.make_stats("First", load=False),
+                               "dance-single", ["Hard"], "sm5",
+                               use_cache=False)
+            self.addCleanup(viewer.close)
+            viewer.set_stats(self.make_stats("Second", load=False))
+        load_stats.assert_not_called()
+        self.assertEqual(len(viewer.model.stats.songs), 1)
+        self.assertIsNotNone(viewer.model.stats.grades)
+
+
+@unittest.skipIf(QApplication is None, "PyQt5 is not installed")
+class ProfileFinderTest(unittest.TestCase):
+    """Looking for local profiles in the background."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def test_stop(self):
+        """Stopping the finder waits for its thread to finish."""
+        with tempfile.TemporaryDirectory() as folder:
+            for number in range(200):
+                profile = os.path.join(folder, "{:08}".format(number))
+                os.mkdir(profile)
+                with open(os.path.join(profile, "Stats.xml"), 'w',
+                          encoding='utf-8') as stats_file:
+                    stats_file.write(STATS.format(name=number))
+            finder = qt.ProfileFinder(folder)
+            finder.start()
+            finder.stop()
+            self.assertFalse(finder.isRunning())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+#!/usr/bin/python3
+# Copyright (C) 2016 Renan Guilherme Lebre Ramos
+# This file is a part of smtracker.
+#
+# smtracker is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for the grading systems."""
+
+import unittest
+
+import smtracker.utils.parse as parse
+import smtracker.utils.systems as systems
+
+
+def make_record(grade, difficulty="Hard", **counts):
+    """Returns a ScoreRecord with a grade and some judgment counts."""
+    record = parse.ScoreRecord("Songs/Group/Title/", "dance-single",
+                               difficulty)
+    record.grade = grade
+    for timing, count in counts.items():
+        setattr(record, timing, count)
+    return record
+
+
+class FailedWithoutNotesTest(unittest.TestCase):
+    """A Failed HighScore without a single judgment."""
+
+    def setUp(self):
+        systems.clear_memo()
+        self.record = make_record("Failed")
+
+    def test_ddr_grades(self):
+        """DDR systems give it an E, like they do for every failed score."""
+        for name in ('supernova2', 'ddra'):
+            system = systems.get_system(name)
+            self.assertEqual(system.grade(self.record), "E")
+            self.assertIsNone(system.score(self.record))
+
+    def test_failed_with_notes_keeps_its_score(self):
+        """Failed scores with notes still get a score."""
+        record = make_record("Failed", W1=10, Miss=10)
+        system = systems.get_system('ddra')
+        self.assertEqual(system.grade(record), "E")
+        self.assertEqual(system.score(record), 500000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+#!/usr/bin/python3
+# Copyright (C) 2016 Renan Guilherme Lebre Ramos
+# This file is a part of smtracker.
+#
+# smtracker is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for timing the phases of a run."""
+
+import unittest
+
+import smtracker.utils.timing as timing
+
+
+class RepeatedPhaseTest(unittest.TestCase):
+    """Phases made of many small pieces of work, like streaming a file."""
+
+    def setUp(self):
+        timing.start()
+        self.addCleanup(timing.stop)
+
+    def get_names(self):
+        """Returns the (depth, name) of every phase recorded so far."""
+        return [(entry['depth'], entry['name'])
+                for entry in timing.stop().phases]
+
+    def test_added_up(self):
+        """Each repeated phase is recorded once inside its parent."""
+        with timing.phase("render"):
+            for _ in timing.timed("extract", range(3)):
+                with timing.phase("grade", repeat=True):
+                    pass
+        with timing.phase("grade", repeat=True):
+            pass
+        self.assertEqual(self.get_names(), [(0, "render"), (1, "extract"),
+                                            (1, "grade"), (0, "grade")])
+
+    def test_timed_items(self):
+        """timed() yields every item of the iterable."""
+        self.assertEqual(list(timing.timed("extract", "abc")), ["a", "b", "c"])
+        self.assertEqual(self.get_names(), [(0, "extract")])
+
+    def test_not_started(self):
+        """Nothing is recorded unless timing was started."""
+        timing.stop()
+        self.assertEqual(list(timing.timed("extract", range(2))), [0, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()